@@ -1,5 +1,6 @@
 """ ectoControl Adapter """
 import logging
+import time
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
@@ -7,9 +8,14 @@ from homeassistant.core import HomeAssistant
 from homeassistant.helpers import device_registry as dr
 
 from .const import DOMAIN, OPT_NAME
-from .coordinator import ModbusDataUpdateCoordinator
+from .coordinator import (
+    ModbusDataUpdateCoordinator,
+    async_setup_adaptive_polling,
+    async_setup_shadow_invalidation,
+    register_groups
+)
 from .master import ModbusMasterCoordinator
-from .registers import REGISTERS_R, REGISTERS_W, REG_DEFAULT_SCAN_INTERVAL
+from .scheduler import PollScheduler
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -25,6 +31,7 @@ _PLATFORMS = [
 
 async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
     """ Set up sensors from a config entry. """
+    setup_started = time.monotonic()
     hass.data.setdefault(DOMAIN, {})
 
     # Create device
@@ -43,43 +50,62 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> b
     )
     await master_coordinator.async_start()
 
-    # Group registers by scan interval
-    update_register_groups = {}
-    for register_addr, config in REGISTERS_R.items():
-        scan_interval = config.get("scan_interval", REG_DEFAULT_SCAN_INTERVAL)
-        if scan_interval not in update_register_groups:
-            update_register_groups[scan_interval] = []
-        update_register_groups[scan_interval].append((register_addr, config))
+    # Group registers by scan interval, adaptive registers get own groups when enabled
+    update_register_groups = register_groups(config_entry.options or config_entry.data)
 
     # Create coordinators for each scan interval group
-    update_coordinators = {}
-    for scan_interval, registers in update_register_groups.items():
-        update_coordinator = ModbusDataUpdateCoordinator(
+    update_coordinators = {
+        group: ModbusDataUpdateCoordinator(
             hass=hass,
             config_entry=config_entry,
             master=master_coordinator,
             registers=registers,
-            scan_interval=scan_interval
+            scan_interval=group[0]
         )
+        for group, registers in update_register_groups.items()
+    }
+
+    # One poll timer for all groups
+    scheduler = PollScheduler(config_entry, master_coordinator, update_coordinators.values())
 
-        # Fetch initial data
-        await update_coordinator.async_config_entry_first_refresh()
-        update_coordinators[scan_interval] = update_coordinator
+    async_setup_adaptive_polling(config_entry, update_coordinators.values())
+    async_setup_shadow_invalidation(config_entry, master_coordinator, update_coordinators.values())
 
+    # Setup and initial data durations (seconds), see diagnostics
+    setup_timings = {}
     hass.data[DOMAIN][config_entry.entry_id] = {
         "master_coordinator": master_coordinator,
         "device_id": device.id,
         "update_coordinators": update_coordinators,
+        "scheduler": scheduler,
         "update_register_groups": update_register_groups,
-        "write_registers": REGISTERS_W
+        "setup_timings": setup_timings
     }
 
     # Set up sensors
     await hass.config_entries.async_forward_entry_setups(config_entry, _PLATFORMS)
+    setup_timings["setup"] = time.monotonic() - setup_started
+
+    # Initial data is fetched in the background, so HA startup does not wait for the bus
+    config_entry.async_create_background_task(
+        hass,
+        _async_start_polling(config_entry, scheduler, setup_timings),
+        f"{DOMAIN} first refresh {config_entry.entry_id}")
 
     return True
 
 
+async def _async_start_polling(config_entry: ConfigEntry, scheduler: PollScheduler, setup_timings: dict) -> None:
+    """ Fetch initial data of all coordinators with one bulk read, then poll on schedule """
+    started = time.monotonic()
+    await scheduler.async_start()
+    setup_timings["first_refresh"] = time.monotonic() - started
+
+    _LOGGER.info(
+        f"'{config_entry.title}' set up in {setup_timings['setup']:.3f}s, "
+        f"initial data fetched in {setup_timings['first_refresh']:.3f}s")
+
+
 async def async_update_options(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
     """ Update options for entry that was configured via user interface. """
     await hass.config_entries.async_reload(config_entry.entry_id)
@@ -89,6 +115,8 @@ async def async_unload_entry(hass: HomeAssistant, config_entry: ConfigEntry) ->
     """ Unload a config entry. """
     await hass.config_entries.async_unload_platforms(config_entry, _PLATFORMS)
 
+    await hass.data[DOMAIN][config_entry.entry_id]["scheduler"].async_stop()
+
     master_coordinator = hass.data[DOMAIN][config_entry.entry_id]["master_coordinator"]
     await master_coordinator.async_stop()
 
@@ -1,12 +1,12 @@
 import logging
 
-from homeassistant.components.binary_sensor import BinarySensorEntity
+from homeassistant.components.binary_sensor import BinarySensorDeviceClass, BinarySensorEntity
+from homeassistant.const import Platform
 from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from .const import DOMAIN
 from .mixins import ModbusSensorMixin, ModbusUniqIdMixin
-from .registers import BM_BINARY
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -20,35 +20,33 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
     sensors = []
 
     # Create sensors for each coordinator
-    for scan_interval, coordinator in coordinators.items():
-        registers = register_groups[scan_interval]
+    for group, coordinator in coordinators.items():
+        registers = register_groups[group]
 
-        for register, config in registers:
-            if "bitmasks" in config:
-                for mask, mask_config in config["bitmasks"].items():
-                    if mask_config["type"] == BM_BINARY:
-                        sensor = ModbusBinarySensor(coordinator, register, config, mask)
-                        sensors.append(sensor)
+        for register in registers:
+            for bitmask in register.bitmasks:
+                if bitmask.platform == Platform.BINARY_SENSOR:
+                    sensors.append(ModbusBinarySensor(coordinator, register, bitmask))
 
-    async_add_entities(sensors, True)
+    async_add_entities(sensors, update_before_add=False)
 
 
 class ModbusBinarySensor(ModbusSensorMixin, ModbusUniqIdMixin, CoordinatorEntity, BinarySensorEntity):
     """ Binary sensor for bitmasks values. """
 
-    def __init__(self, coordinator, register_addr, register_config, bitmask):
-        super().__init__(coordinator)
-        self.register_addr = register_addr
-        self.register_config = register_config
+    def __init__(self, coordinator, register, bitmask):
+        # Coordinator notifies only when this bitmask changes
+        super().__init__(coordinator, context=(register.address, bitmask.mask))
+        self.register_addr = register.address
         self.bitmask = bitmask
-        self.bitmask_config = register_config["bitmasks"][bitmask]
 
         # Entity attributes
         self._attr_has_entity_name = True
-        self._attr_translation_key = self.bitmask_config.get("name")
-        self._attr_unique_id = f"{self._unique_id_prefix}_{self._attr_translation_key}_{register_addr:#06x}"
-        self._attr_device_class = self.bitmask_config.get("device_class")
-        self._attr_entity_category = self.bitmask_config.get("category")
+        self._attr_translation_key = bitmask.name
+        self._attr_unique_id = f"{self._unique_id_prefix}_{bitmask.unique_suffix}"
+        self._attr_device_class = BinarySensorDeviceClass(bitmask.device_class) if bitmask.device_class else None
+        self._attr_entity_category = bitmask.category
+        self._attr_icon = bitmask.icon
 
         # Device info
         self._attr_device_info = DeviceInfo(
@@ -58,19 +56,8 @@ class ModbusBinarySensor(ModbusSensorMixin, ModbusUniqIdMixin, CoordinatorEntity
     @property
     def is_on(self):
         """ Return True if the bits is set. """
-        if self.coordinator.data is None:
+        decoded = self._get_decoded()
+        if decoded is None:
             return None
 
-        raw_data = self.coordinator.data.get(self.register_addr)
-        if raw_data is None:
-            return None
-
-        raw_value = self._get_raw_value(raw_data)
-        if raw_value is None:
-            return None
-
-        return bool(raw_value & self.bitmask)
-
-    @property
-    def icon(self):
-        return self.bitmask_config.get("icon")
+        return decoded.bits.get(self.bitmask.mask)
@@ -0,0 +1,104 @@
+""" Circuit breaker of one adapter """
+import logging
+import time
+from typing import Any, Callable, Dict, Optional
+
+from .const import (
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_OPEN_TIME_MAX,
+    BREAKER_OPEN_TIME_MIN,
+    BREAKER_STATE_CLOSED,
+    BREAKER_STATE_HALF_OPEN,
+    BREAKER_STATE_OPEN
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class CircuitOpenError(ConnectionError):
+    """ Adapter is unreachable, the operation was not sent """
+
+
+class CircuitBreaker:
+    """
+    Fails operations at once while the adapter is unreachable.
+
+    Closed: operations pass, consecutive failures are counted.
+    Open: after BREAKER_FAILURE_THRESHOLD consecutive failures operations
+    are rejected with CircuitOpenError until the open time is over.
+    Half-open: one probe operation passes, its outcome closes the breaker
+    or opens it again for twice the time.
+    """
+
+    def __init__(self, name: str, on_open: Optional[Callable[[CircuitOpenError], None]] = None):
+        self._name = name
+        self._on_open = on_open
+        self.state = BREAKER_STATE_CLOSED
+        self._failures = 0
+        self._open_time = BREAKER_OPEN_TIME_MIN
+        self._opened_at = 0.0
+        self._probe_started = None
+
+        # Diagnostics
+        self.trips = 0
+        self.rejected = 0
+
+    def check(self):
+        """ Raise CircuitOpenError unless an operation may be sent now """
+        if self.state == BREAKER_STATE_CLOSED:
+            return
+
+        now = time.monotonic()
+        if self.state == BREAKER_STATE_OPEN:
+            remaining = self._opened_at + self._open_time - now
+            if remaining > 0:
+                self.rejected += 1
+                raise CircuitOpenError(f"Adapter '{self._name}' is unreachable, next probe in {remaining:.1f}s")
+            self.state = BREAKER_STATE_HALF_OPEN
+            self._probe_started = None
+
+        # One probe at a time, a probe without outcome is replaced after the open time
+        if self._probe_started is not None and now - self._probe_started < self._open_time:
+            self.rejected += 1
+            raise CircuitOpenError(f"Adapter '{self._name}' is unreachable, probe in progress")
+        self._probe_started = now
+        _LOGGER.debug(f"Adapter '{self._name}': circuit breaker probe")
+
+    def record(self, success: bool):
+        """ Outcome of an operation sent to the adapter """
+        if success:
+            if self.state != BREAKER_STATE_CLOSED:
+                _LOGGER.info(f"Adapter '{self._name}' is reachable again, circuit breaker closed")
+            self.state = BREAKER_STATE_CLOSED
+            self._failures = 0
+            self._open_time = BREAKER_OPEN_TIME_MIN
+            self._probe_started = None
+            return
+
+        self._failures += 1
+        if self.state == BREAKER_STATE_HALF_OPEN:
+            self._open(min(BREAKER_OPEN_TIME_MAX, self._open_time * 2))
+        elif self.state == BREAKER_STATE_CLOSED and self._failures >= BREAKER_FAILURE_THRESHOLD:
+            self._open(BREAKER_OPEN_TIME_MIN)
+
+    def _open(self, open_time: float):
+        self.state = BREAKER_STATE_OPEN
+        self._open_time = open_time
+        self._opened_at = time.monotonic()
+        self._probe_started = None
+        self.trips += 1
+        _LOGGER.warning(
+            f"Adapter '{self._name}' is unreachable after {self._failures} failures, "
+            f"circuit breaker open for {open_time:.0f}s")
+        if self._on_open is not None:
+            self._on_open(CircuitOpenError(f"Adapter '{self._name}' is unreachable"))
+
+    @property
+    def diagnostics(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "open_time": self._open_time,
+            "trips": self.trips,
+            "rejected": self.rejected
+        }
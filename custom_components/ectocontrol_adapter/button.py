@@ -1,11 +1,12 @@
 import logging
 
-from homeassistant.components.button import ButtonEntity
+from homeassistant.components.button import ButtonDeviceClass, ButtonEntity
+from homeassistant.const import Platform
 from homeassistant.helpers.device_registry import DeviceInfo
 
 from .const import DOMAIN
 from .mixins import ModbusUniqIdMixin
-from .registers import BUTTON_INPUT
+from .register_index import write_registers_for
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -14,23 +15,12 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
     """ Set up select entities  """
     data = hass.data[DOMAIN][config_entry.entry_id]
     master_coordinator = data["master_coordinator"]
-    write_registers = data["write_registers"]
 
-    entities = []
-
-    for register_addr, register_config in write_registers.items():
-        if register_config.get("input_type") == BUTTON_INPUT:
-            if not ("buttons" in register_config and len(register_config["buttons"])):
-                continue
-
-            for button_config in register_config["buttons"]:
-                entities.append(ModbusButton(
-                    hass,
-                    master_coordinator,
-                    register_addr,
-                    register_config,
-                    button_config
-                ))
+    entities = [
+        ModbusButton(hass, master_coordinator, register, button)
+        for register in write_registers_for(Platform.BUTTON)
+        for button in register.buttons
+    ]
 
     async_add_entities(entities)
 
@@ -38,18 +28,19 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
 class ModbusButton(ModbusUniqIdMixin, ButtonEntity):
     """ Modbus Button entity """
 
-    def __init__(self, hass, master_coordinator, register_addr, register_config, button_config):
+    def __init__(self, hass, master_coordinator, register, button):
         self.hass = hass
         self.coordinator = master_coordinator
-        self.register_addr = register_addr
-        self.register_config = register_config
-        self.button_config = button_config
+        self.register_addr = register.address
+        self.status_register = register.status_register
+        self.button = button
 
         self._attr_has_entity_name = True
-        self._attr_translation_key = f"{register_config.get('name')}_{button_config.get('name')}"
-        self._attr_unique_id = f"{self._unique_id_prefix}_{self._attr_translation_key}_{register_addr:#06x}"
-        self._attr_device_class = button_config.get("device_class") or register_config.get("device_class")
-        self._attr_entity_category = button_config.get("category") or register_config.get("category")
+        self._attr_translation_key = button.name
+        self._attr_unique_id = f"{self._unique_id_prefix}_{button.unique_suffix}"
+        self._attr_device_class = ButtonDeviceClass(button.device_class) if button.device_class else None
+        self._attr_entity_category = button.category
+        self._attr_icon = button.icon
 
         # Device info
         self._attr_device_info = DeviceInfo(
@@ -58,14 +49,13 @@ class ModbusButton(ModbusUniqIdMixin, ButtonEntity):
 
     async def async_press(self) -> None:
         """ Press button """
-        wrval = self.button_config.get("value")
-        if not isinstance(wrval, int):
-            raise Exception(f"Can not write value '{wrval}' to register={self.register_addr:#06x}")
-
+        # Integer value is checked by the register index
+        wrval = self.button.value
         success = await self.coordinator.write_registers(
             address=self.register_addr,
             values=[wrval],
-            status_register=self.register_config.get("status_register"))
+            status_register=self.status_register,
+            force=True)
 
         if success:
             _LOGGER.info(f"Successfully set '{self._attr_translation_key}' to '{wrval}'")
@@ -75,7 +65,3 @@ class ModbusButton(ModbusUniqIdMixin, ButtonEntity):
     @property
     def should_poll(self) -> bool:
         return False
-
-    @property
-    def icon(self):
-        return self.button_config.get("icon") or self.register_config.get("icon")
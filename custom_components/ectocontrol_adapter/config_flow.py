@@ -4,6 +4,7 @@ from homeassistant import config_entries
 from homeassistant.core import callback
 from homeassistant.helpers.dispatcher import async_dispatcher_send
 from homeassistant.helpers.selector import (
+    BooleanSelector,
     NumberSelector,
     NumberSelectorConfig,
     NumberSelectorMode,
@@ -50,14 +51,18 @@ async def create_schema(hass, config_entry=None, user_input=None, type="init"):
                     options=SERIAL_STOPBITS, mode=SelectSelectorMode.DROPDOWN)),
         })
     elif type in ("tcp", "udp", "rtuovertcp"):
-        return vol.Schema({
+        schema = {
             # Host + Port settings
             vol.Required(OPT_HOST): TextSelector(TextSelectorConfig(type=TextSelectorType.TEXT)),
 
             vol.Required(OPT_PORT, default=DEFAULT_PORT):
                 NumberSelector(NumberSelectorConfig(min=1, max=65535, mode=NumberSelectorMode.BOX)),
-
-        })
+        }
+        if type != "rtuovertcp":
+            # RTU frames have no transaction id, requests can not be pipelined
+            schema[vol.Required(OPT_INFLIGHT_WINDOW, default=DEFAULT_INFLIGHT_WINDOW)] = \
+                NumberSelector(NumberSelectorConfig(min=1, max=INFLIGHT_WINDOW_MAX, mode=NumberSelectorMode.BOX))
+        return vol.Schema(schema)
     else:
         return vol.Schema({
             vol.Required(OPT_NAME): TextSelector(TextSelectorConfig(type=TextSelectorType.TEXT)),
@@ -72,9 +77,30 @@ async def create_schema(hass, config_entry=None, user_input=None, type="init"):
 
             vol.Required(OPT_SLAVE, default=DEFAULT_SLAVE_ID):
                 NumberSelector(NumberSelectorConfig(min=0, max=248, mode=NumberSelectorMode.BOX)),
+
+            vol.Required(OPT_READ_MAX_GAP, default=DEFAULT_READ_MAX_GAP):
+                NumberSelector(NumberSelectorConfig(min=0, max=64, mode=NumberSelectorMode.BOX)),
+
+            # Adaptive polling
+            vol.Required(OPT_ADAPTIVE_POLLING, default=DEFAULT_ADAPTIVE_POLLING): BooleanSelector(),
+
+            vol.Required(OPT_ADAPTIVE_MIN_INTERVAL, default=DEFAULT_ADAPTIVE_MIN_INTERVAL):
+                NumberSelector(NumberSelectorConfig(min=1, max=60, mode=NumberSelectorMode.BOX)),
+
+            vol.Required(OPT_ADAPTIVE_MAX_INTERVAL, default=DEFAULT_ADAPTIVE_MAX_INTERVAL):
+                NumberSelector(NumberSelectorConfig(min=5, max=600, mode=NumberSelectorMode.BOX)),
+
+            vol.Required(OPT_SKIP_REDUNDANT_WRITES, default=DEFAULT_SKIP_REDUNDANT_WRITES): BooleanSelector(),
         })
 
 
+def check_adaptive_intervals(user_input):
+    errors = {}
+    if float(user_input[OPT_ADAPTIVE_MAX_INTERVAL]) < float(user_input[OPT_ADAPTIVE_MIN_INTERVAL]):
+        errors[OPT_ADAPTIVE_MAX_INTERVAL] = "ec_adaptive_interval_order"
+    return errors
+
+
 async def check_user_input(user_input):
     errors = {}
     client = create_modbus_client(user_input)
@@ -121,17 +147,21 @@ class ECAdapterConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
         _LOGGER.debug("Request to create config (init step): %s", user_input)
 
+        errors = {}
         if user_input is not None:
-            self.config_data.update(user_input)
-            self.next_step = self.async_step_connection
-            return await self.async_step_connection()
+            errors = check_adaptive_intervals(user_input)
+            if not errors:
+                self.config_data.update(user_input)
+                self.next_step = self.async_step_connection
+                return await self.async_step_connection()
 
         schema = await create_schema(
             hass=self.hass,
             user_input=user_input)
         return self.async_show_form(
             step_id="user",
-            data_schema=schema
+            data_schema=self.add_suggested_values_to_schema(schema, user_input or {}),
+            errors=errors
         )
 
     async def async_step_connection(self, user_input=None):
@@ -181,9 +211,11 @@ class ECAdapterOptionsFlow(config_entries.OptionsFlow):
 
         errors = {}
         if user_input is not None:
-            self.config_data.update(user_input)
-            self.next_step = self.async_step_connection
-            return await self.async_step_connection()
+            errors = check_adaptive_intervals(user_input)
+            if not errors:
+                self.config_data.update(user_input)
+                self.next_step = self.async_step_connection
+                return await self.async_step_connection()
 
         schema = await create_schema(
             hass=self.hass,
@@ -191,7 +223,7 @@ class ECAdapterOptionsFlow(config_entries.OptionsFlow):
             user_input=user_input
         )
 
-        options = self.config_entry.options or self.config_entry.data
+        options = user_input or self.config_entry.options or self.config_entry.data
         return self.async_show_form(
             step_id="init",
             data_schema=self.add_suggested_values_to_schema(schema, options),
@@ -0,0 +1,223 @@
+""" Modbus connection manager """
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Dict
+
+from .const import (
+    CONNECTION_STATE_CONNECTED,
+    CONNECTION_STATE_DEGRADED,
+    CONNECTION_STATE_DISCONNECTED,
+    CONNECTION_STATE_RECONNECTING,
+    KEEPALIVE_INTERVAL,
+    MODBUS_TYPE_RTU_OVER_TCP,
+    MODBUS_TYPE_SERIAL,
+    OPT_MODBUS_TYPE,
+    OPT_RESPONSE_TIMEOUT,
+    RECONNECT_DELAY_MAX,
+    RECONNECT_DELAY_MIN,
+    RECONNECT_JITTER
+)
+from .helpers import create_modbus_client
+from .metrics import frame_sizes
+from .timing import RtuTiming, RttEstimator
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ModbusConnection:
+    """
+    Owns the Modbus client of a transport.
+
+    The client object is created once and reconnected in place. Failed
+    connects are retried with exponential backoff and jitter, operations
+    during the backoff fail immediately instead of waiting out a timeout.
+
+    The response timeout follows the measured round-trip time, the
+    configured timeout is its upper limit. With RTU framing the transfer
+    time of the frames is added and the line is kept silent for 3.5
+    characters between frames.
+
+    Serial and RTU over TCP frames carry no transaction id, pymodbus takes
+    a late response for the answer to the next request. After a lost or
+    mismatched response the line is kept quiet for the transfer time of
+    the expected response and the silent interval, so a straggler already
+    on the way arrives while no request is waiting and is discarded.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self._config = config
+        self._client = None
+        self.state = CONNECTION_STATE_DISCONNECTED
+
+        self._attempts = 0
+        self._next_attempt = 0.0
+        self._disconnected_at = None
+        self._consecutive_failures = 0
+        self._last_activity = time.monotonic()
+
+        # Response timing
+        self.rtt = RttEstimator(float(config[OPT_RESPONSE_TIMEOUT]))
+        self.rtu = (
+            RtuTiming(config) if config[OPT_MODBUS_TYPE] in (MODBUS_TYPE_SERIAL, MODBUS_TYPE_RTU_OVER_TCP) else None)
+        self._last_frame_end = 0.0
+        self._quiet_until = 0.0
+
+        # Diagnostics
+        self.reconnects = 0
+        self.last_reconnect_latency = None
+        self._total_reconnect_latency = 0.0
+
+    async def async_get_client(self):
+        """ Return connected Modbus client """
+        if self._client is not None and self._client.connected:
+            return self._client
+
+        self._set_disconnected()
+
+        now = time.monotonic()
+        if now < self._next_attempt:
+            raise ConnectionError(f"Modbus device not connected, next attempt in {self._next_attempt - now:.1f}s")
+
+        try:
+            if self._client is None:
+                self._client = create_modbus_client(self._config)
+            # pymodbus uses the response timeout for connects as well
+            self._set_timeout(self.rtt.max_timeout)
+            result = await self._client.connect()
+        except Exception as e:
+            _LOGGER.error(f"Error connecting to Modbus: {e}")
+            result = False
+
+        if not result or not self._client.connected:
+            self._schedule_reconnect()
+            raise ConnectionError("Modbus device not connected")
+
+        self._set_connected()
+        return self._client
+
+    def _set_disconnected(self):
+        if self.state in (CONNECTION_STATE_CONNECTED, CONNECTION_STATE_DEGRADED):
+            _LOGGER.warning("Modbus connection lost")
+            self.state = CONNECTION_STATE_RECONNECTING
+            self._disconnected_at = time.monotonic()
+            self._attempts = 0
+            self._next_attempt = 0.0
+
+    def _set_connected(self):
+        now = time.monotonic()
+        if self._disconnected_at is not None:
+            self.reconnects += 1
+            self.last_reconnect_latency = now - self._disconnected_at
+            self._total_reconnect_latency += self.last_reconnect_latency
+            _LOGGER.info(
+                f"Modbus connection restored in {self.last_reconnect_latency:.1f}s "
+                f"after {self._attempts} failed attempts")
+
+        self.state = CONNECTION_STATE_CONNECTED
+        self._attempts = 0
+        self._next_attempt = 0.0
+        self._disconnected_at = None
+        self._consecutive_failures = 0
+        self._last_activity = now
+
+    def _schedule_reconnect(self):
+        """ Exponential backoff with jitter """
+        delay = min(RECONNECT_DELAY_MAX, RECONNECT_DELAY_MIN * 2 ** self._attempts)
+        delay *= 1 + random.uniform(-RECONNECT_JITTER, RECONNECT_JITTER)
+        self._attempts += 1
+        self._next_attempt = time.monotonic() + delay
+        self.state = CONNECTION_STATE_RECONNECTING
+        _LOGGER.error(f"Failed to connect to Modbus device, attempt {self._attempts}, next in {delay:.1f}s")
+
+    def transfer_time(self, op: str, data: Dict[str, Any]) -> float:
+        """ Time on the wire of request and response, RTU framing only """
+        if self.rtu is None:
+            return 0.0
+        sent, received = frame_sizes(MODBUS_TYPE_SERIAL, op, data)
+        return self.rtu.frame_time(sent + received) + self.rtu.silent_interval
+
+    def quiet_time(self, op: str, data: Dict[str, Any]) -> float:
+        """ Time a late response to the request may still occupy the line """
+        if self.rtu is None or op is None:
+            return 0.0
+        _, received = frame_sizes(MODBUS_TYPE_SERIAL, op, data)
+        return self.rtu.frame_time(received) + self.rtu.silent_interval
+
+    def response_timeout(self, op: str, data: Dict[str, Any]) -> float:
+        return min(self.rtt.max_timeout, self.transfer_time(op, data) + self.rtt.timeout)
+
+    async def async_prepare_request(self, op: str, data: Dict[str, Any]):
+        """ Set response timeout of the next request, wait until the line may be used """
+        now = time.monotonic()
+        idle = self._quiet_until - now
+        if self.rtu is not None:
+            idle = max(idle, self._last_frame_end + self.rtu.silent_interval - now)
+        if idle > 0:
+            await asyncio.sleep(idle)
+        if self._client is not None:
+            self._set_timeout(self.response_timeout(op, data))
+
+    def _set_timeout(self, timeout: float):
+        # Transaction manager of the client holds its own copy of the parameters
+        self._client.ctx.comm_params.timeout_connect = timeout
+
+    def record_success(self, op: str = None, data: Dict[str, Any] = None, duration: float = None, retries: int = 0):
+        """ Response received, `duration` of the request is a round-trip sample """
+        self._last_activity = self._last_frame_end = time.monotonic()
+        self._consecutive_failures = 0
+        if self.state == CONNECTION_STATE_DEGRADED:
+            self.state = CONNECTION_STATE_CONNECTED
+
+        if retries:
+            # Karn's algorithm: no sample from retried requests, the timeout was too short
+            self.rtt.on_timeout()
+        elif duration is not None:
+            self.rtt.add(max(0.0, duration - self.transfer_time(op, data)))
+
+    def record_failure(self, timeout: bool = False, op: str = None, data: Dict[str, Any] = None):
+        """ Request without a (matching) response on a live connection """
+        self._last_activity = self._last_frame_end = time.monotonic()
+        self._consecutive_failures += 1
+        if self.state == CONNECTION_STATE_CONNECTED:
+            self.state = CONNECTION_STATE_DEGRADED
+        if timeout:
+            self.rtt.on_timeout()
+            self._quiet_until = self._last_frame_end + self.quiet_time(op, data)
+
+    def retry_in(self) -> float:
+        """ Seconds until the next connect attempt, 0 when connected or due """
+        if self._client is not None and self._client.connected:
+            return 0.0
+        return max(0.0, self._next_attempt - time.monotonic())
+
+    def keepalive_due(self) -> bool:
+        """ TCP/UDP gateways may drop idle sockets, probe them when idle """
+        return (
+            self._config[OPT_MODBUS_TYPE] != MODBUS_TYPE_SERIAL and
+            self.state == CONNECTION_STATE_CONNECTED and
+            time.monotonic() - self._last_activity >= KEEPALIVE_INTERVAL
+        )
+
+    def close(self):
+        if self._client:
+            self._client.close()
+        self.state = CONNECTION_STATE_DISCONNECTED
+
+    @property
+    def diagnostics(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "state": self.state,
+            "reconnects": self.reconnects,
+            "last_reconnect_latency": self.last_reconnect_latency,
+            "avg_reconnect_latency": (
+                self._total_reconnect_latency / self.reconnects if self.reconnects else None),
+            "failed_attempts": self._attempts,
+            "next_attempt_in": max(0.0, self._next_attempt - now) if self._next_attempt else None,
+            "consecutive_failures": self._consecutive_failures,
+            "idle_time": now - self._last_activity,
+            "rtt": self.rtt.diagnostics,
+            "rtu": self.rtu.diagnostics if self.rtu is not None else None
+        }
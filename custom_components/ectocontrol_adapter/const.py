@@ -20,10 +20,32 @@ OPT_PARITY = "parity"
 OPT_STOPBITS = "stopbits"
 OPT_HOST = "host"
 OPT_PORT = "port"
+OPT_READ_MAX_GAP = "read_max_gap"
+OPT_ADAPTIVE_POLLING = "adaptive_polling"
+OPT_ADAPTIVE_MIN_INTERVAL = "adaptive_min_interval"
+OPT_ADAPTIVE_MAX_INTERVAL = "adaptive_max_interval"
+OPT_SKIP_REDUNDANT_WRITES = "skip_redundant_writes"
+OPT_INFLIGHT_WINDOW = "inflight_window"
 
 # Default timeout for Modbus response
 DEFAULT_RESPONSE_TIMEOUT = 5
 
+# Default max gap (registers) between registers merged into one block read
+DEFAULT_READ_MAX_GAP = 16
+
+# Default adaptive polling settings: interval floor while the burner is active
+# and ceiling while it is idle (seconds)
+DEFAULT_ADAPTIVE_POLLING = False
+DEFAULT_ADAPTIVE_MIN_INTERVAL = 5
+DEFAULT_ADAPTIVE_MAX_INTERVAL = 60
+
+# Skip writes of values the adapter already acknowledged
+DEFAULT_SKIP_REDUNDANT_WRITES = True
+
+# Requests in flight on one TCP/UDP transport, each on its own connection
+DEFAULT_INFLIGHT_WINDOW = 1
+INFLIGHT_WINDOW_MAX = 4
+
 # Default slave/unit ID
 DEFAULT_SLAVE_ID = 1
 
@@ -47,6 +69,9 @@ MODBUS_TYPES = [
     {"value": MODBUS_TYPE_SERIAL, "label": "Serial"}
 ]
 
+# Modbus exception code of a block read covering addresses the adapter does not serve
+MODBUS_EXCEPTION_ILLEGAL_ADDRESS = 0x02
+
 # Baud rate choices
 DEFAULT_SERIAL_BAUDRATE = 19200
 SERIAL_BAUDRATES = [
@@ -93,3 +118,87 @@ SERIAL_STOPBITS = [
 
 # Modbus Queue wait timeout (seconds)
 QUEUE_TIMEOUT = 1.0
+
+# Connection states
+CONNECTION_STATE_DISCONNECTED = "disconnected"
+CONNECTION_STATE_CONNECTED = "connected"
+CONNECTION_STATE_DEGRADED = "degraded"
+CONNECTION_STATE_RECONNECTING = "reconnecting"
+
+# Circuit breaker states
+BREAKER_STATE_CLOSED = "closed"
+BREAKER_STATE_OPEN = "open"
+BREAKER_STATE_HALF_OPEN = "half_open"
+
+# Consecutive failures which open the circuit breaker, time (seconds) until the
+# first probe, doubled after every failed probe up to the max
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_OPEN_TIME_MIN = 5.0
+BREAKER_OPEN_TIME_MAX = 60.0
+
+# Reconnect backoff (seconds) and relative jitter
+RECONNECT_DELAY_MIN = 0.5
+RECONNECT_DELAY_MAX = 60.0
+RECONNECT_JITTER = 0.2
+
+# Response timeout from measured round trips (RFC 6298): gains of the smoothed
+# round-trip time and its variation, lowest timeout and clock granularity (seconds)
+RTT_ALPHA = 0.125
+RTT_BETA = 0.25
+RTT_TIMEOUT_MIN = 0.05
+RTT_GRANULARITY = 0.01
+
+# pymodbus retries of a request without response, each after the response timeout.
+# Serial and RTU over TCP frames carry no transaction id and are sent once: the
+# response to the first attempt would be left on the line to answer the next request.
+REQUEST_RETRIES = 1
+RTU_REQUEST_RETRIES = 0
+
+# Idle time (seconds) after which TCP/UDP gateways are probed to keep the socket alive
+KEEPALIVE_INTERVAL = 30.0
+
+# Modbus operation priority classes (lower value is served first)
+OP_PRIORITY_WRITE = 0
+OP_PRIORITY_RESYNC = 1
+OP_PRIORITY_FAST_POLL = 2
+OP_PRIORITY_SLOW_POLL = 3
+
+OP_PRIORITY_NAMES = {
+    OP_PRIORITY_WRITE: "write",
+    OP_PRIORITY_RESYNC: "resync",
+    OP_PRIORITY_FAST_POLL: "fast_poll",
+    OP_PRIORITY_SLOW_POLL: "slow_poll"
+}
+
+# Max queue wait (seconds) after which a poll is served ahead of higher priorities
+OP_PRIORITY_MAX_WAIT = {
+    OP_PRIORITY_FAST_POLL: 5.0,
+    OP_PRIORITY_SLOW_POLL: 15.0
+}
+
+# Max queued operations per priority class and in the whole bus queue
+OP_PRIORITY_QUEUE_LIMIT = {
+    OP_PRIORITY_WRITE: 64,
+    OP_PRIORITY_RESYNC: 32,
+    OP_PRIORITY_FAST_POLL: 32,
+    OP_PRIORITY_SLOW_POLL: 16
+}
+OP_QUEUE_LIMIT = 96
+
+# Classes whose queued operations are shed on overload, least valuable first
+OP_PRIORITY_SHED_ORDER = (OP_PRIORITY_SLOW_POLL, OP_PRIORITY_FAST_POLL)
+
+# Time (seconds) to collect write-after-connected values into one batched write
+RESYNC_COLLECT_DELAY = 0.2
+
+# Scan groups polled at this interval (seconds) or faster use the fast poll class
+POLL_FAST_MAX_INTERVAL = 15
+
+# Scan groups due within this time (seconds) of a scheduler tick are polled with it
+POLL_TICK_TOLERANCE = 0.5
+
+# Time constant (seconds) of the bus operation rate and utilisation averages
+METRICS_RATE_TAU = 60.0
+
+# Number of Modbus transactions kept by the trace
+TRACE_SIZE = 500
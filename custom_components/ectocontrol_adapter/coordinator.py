@@ -1,18 +1,44 @@
 import logging
-from datetime import timedelta
+import time
+from typing import Dict, List, Optional, Tuple
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 
-from .const import DOMAIN
+from .const import (
+    DEFAULT_ADAPTIVE_MAX_INTERVAL,
+    DEFAULT_ADAPTIVE_MIN_INTERVAL,
+    DEFAULT_ADAPTIVE_POLLING,
+    DEFAULT_READ_MAX_GAP,
+    DOMAIN,
+    MODBUS_EXCEPTION_ILLEGAL_ADDRESS,
+    OP_PRIORITY_FAST_POLL,
+    OP_PRIORITY_SLOW_POLL,
+    OPT_ADAPTIVE_MAX_INTERVAL,
+    OPT_ADAPTIVE_MIN_INTERVAL,
+    OPT_ADAPTIVE_POLLING,
+    OPT_READ_MAX_GAP,
+    POLL_FAST_MAX_INTERVAL
+)
 from .master import ModbusMasterCoordinator
-from .registers import REGISTERS_R, REG_DEFAULT_SCAN_INTERVAL
+from .operations import OperationDroppedError
+from .planner import build_read_plan
+from .register_index import READ_REGISTERS
+from .registers import (
+    ADAPTER_STATUS_CONNECTED,
+    BURNER_STATUS_ON,
+    REG_DEFAULT_SCAN_INTERVAL,
+    REG_R_ADAPTER_STATUS,
+    REG_R_ADAPTER_UPTIME,
+    REG_R_BURNER_MODULATION,
+    REG_R_BURNER_STATUS
+)
 
 _LOGGER = logging.getLogger(__name__)
 
 
 class ModbusDataUpdateCoordinator(DataUpdateCoordinator):
-    """ Modbus data updater """
+    """ Modbus data updater, polled by the PollScheduler of the adapter """
 
     def __init__(
             self,
@@ -25,30 +51,250 @@ class ModbusDataUpdateCoordinator(DataUpdateCoordinator):
             hass,
             _LOGGER,
             name=DOMAIN,
-            update_interval=timedelta(seconds=scan_interval))
+            update_interval=None)
         self.hass = hass
         self.config_entry = config_entry
         self._config = config_entry.options or config_entry.data
         self._master = master
 
-        self._registers = [addr for addr, config in registers]
-        if not set(self._registers).issubset(REGISTERS_R.keys()):
-            error = f"Unwnown registers found in: {self._registers}"
-            _LOGGER.error(error)
-            raise ValueError(error)
+        # ReadRegister descriptors of the group
+        self._registers = tuple(register.address for register in registers)
+        self._decoders = {register.address: register.decoder for register in registers}
+
+        # Fast groups are served ahead of slow diagnostic groups
+        self._priority = OP_PRIORITY_FAST_POLL if scan_interval <= POLL_FAST_MAX_INTERVAL else OP_PRIORITY_SLOW_POLL
+
+        # Adaptive polling: tighten interval while the burner is active
+        self._scan_interval = scan_interval
+        self._poll_interval = scan_interval
+        self.scheduler = None  # PollScheduler driving this group
+        self._adaptive = (
+            self._config.get(OPT_ADAPTIVE_POLLING, DEFAULT_ADAPTIVE_POLLING) and
+            any(register.adaptive for register in registers))
+        self._adaptive_min = int(self._config.get(OPT_ADAPTIVE_MIN_INTERVAL, DEFAULT_ADAPTIVE_MIN_INTERVAL))
+        self._adaptive_max = int(self._config.get(OPT_ADAPTIVE_MAX_INTERVAL, DEFAULT_ADAPTIVE_MAX_INTERVAL))
+        self._burner_active = None
+
+        # Listener contexts changed by the last update, None means all
+        self._changed = None
+        self._notified_success = None
+
+        # Merge registers into the fewest block reads
+        self._read_plan = build_read_plan(
+            [(register.address, register.count) for register in registers],
+            max_gap=int(self._config.get(OPT_READ_MAX_GAP, DEFAULT_READ_MAX_GAP)))
 
     async def _async_update_data(self):
-        data = {}
+        """ Refresh of this group alone, e.g. requested by HA """
         try:
-            for register in self._registers:
-                result = await self._master.read_holding_registers(
-                    address=register,
-                    count=REGISTERS_R[register]["count"])
-                if result is None or result.isError():
-                    _LOGGER.error("Modbus read error")
-                    data[register] = None
-                else:
-                    data[register] = result.registers
+            data = await async_read_plan(
+                self._master, self._read_plan, self._priority, deadline=time.monotonic() + self._poll_interval)
         except Exception as e:
             raise UpdateFailed(f"Exception while Modbus read: {e}")
-        return data
+
+        decoded = self._decode(data)
+        self._changed = self._diff(self.data, decoded)
+        return decoded
+
+    def _decode(self, data):
+        """ Decode each register once, entities read the shared snapshot; registers not read keep their value """
+        previous = self.data or {}
+        decoded = {}
+        for register in self._registers:
+            if register not in data:
+                decoded[register] = previous.get(register)
+            elif data[register] is not None:
+                decoded[register] = self._decoders[register].decode_register(data[register])
+            else:
+                decoded[register] = None
+        return decoded
+
+    @callback
+    def async_set_polled_data(self, data) -> None:
+        """ Set data read by the scheduler for several groups at once """
+        if not any(register in data for register in self._registers):
+            return
+        decoded = self._decode(data)
+        self._changed = self._diff(self.data, decoded)
+        self.async_set_updated_data(decoded)
+        self._async_refresh_finished()
+
+    @property
+    def registers(self):
+        return self._registers
+
+    @property
+    def scan_interval(self) -> int:
+        return self._scan_interval
+
+    @property
+    def poll_interval(self) -> int:
+        """ Current interval, differs from scan interval with adaptive polling """
+        return self._poll_interval
+
+    @property
+    def priority(self) -> int:
+        return self._priority
+
+    @property
+    def adaptive(self) -> bool:
+        return self._adaptive
+
+    @callback
+    def async_set_burner_active(self, active: bool) -> None:
+        """ Switch adaptive polling interval on burner state change """
+        if not self._adaptive or active == self._burner_active:
+            return
+
+        self._burner_active = active
+        if active:
+            interval = min(self._adaptive_min, self._scan_interval)
+            _LOGGER.debug(f"Burner is active, poll registers {self._registers} every {interval}s")
+            self._set_poll_interval(interval)
+        else:
+            self._set_poll_interval(self._scan_interval)
+
+    @callback
+    def _async_refresh_finished(self) -> None:
+        """ Back off while the burner is idle """
+        if self._adaptive and self._burner_active is False and self._poll_interval < self._adaptive_max:
+            self._set_poll_interval(min(self._adaptive_max, self._poll_interval * 2))
+
+    @callback
+    def _set_poll_interval(self, interval: int) -> None:
+        self._poll_interval = interval
+        if self.scheduler is not None:
+            self.scheduler.async_reschedule(self)
+
+    @staticmethod
+    def _diff(previous, data):
+        """ Listener contexts (register, bitmask) whose value changed """
+        if previous is None:
+            return None
+
+        changed = set()
+        for register, decoded in data.items():
+            old = previous.get(register)
+            if old is not None and decoded is not None:
+                if old.raw == decoded.raw:
+                    continue
+                if old.value != decoded.value or old.converted != decoded.converted:
+                    changed.add((register, None))
+                changed.update(
+                    (register, mask) for mask, value in decoded.bits.items()
+                    if old.bits.get(mask) != value)
+            elif old is not decoded:
+                changed.add((register, None))
+                changed.update((register, bitmask.mask) for bitmask in READ_REGISTERS[register].bitmasks)
+        return changed
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """ Notify only entities bound to changed registers or bitmasks """
+        notify_all = self._changed is None or self.last_update_success != self._notified_success
+        changed, self._changed = self._changed, set()
+        self._notified_success = self.last_update_success
+
+        for update_callback, context in list(self._listeners.values()):
+            if notify_all or context is None or context in changed:
+                update_callback()
+
+
+def register_groups(config) -> Dict[Tuple[int, bool], list]:
+    """ Registers grouped by scan interval, adaptive registers get own groups when enabled """
+    adaptive_polling = config.get(OPT_ADAPTIVE_POLLING, DEFAULT_ADAPTIVE_POLLING)
+    groups = {}
+    for register in READ_REGISTERS.values():
+        groups.setdefault((register.scan_interval, adaptive_polling and register.adaptive), []).append(register)
+    return groups
+
+
+async def async_read_plan(master, plan, priority, deadline=None) -> Dict[int, Optional[List[int]]]:
+    """
+    Execute read plan, registers which could not be read are None.
+
+    Registers of blocks dropped unsent (expired or shed) are left out, the
+    caller keeps their previous values. Some adapters reject reading holes: a block answered with ILLEGAL DATA
+    ADDRESS is split into single reads in `plan`, so later polls of the
+    cached plan do not send it again. Other errors (busy, gateway) are
+    transient and only void the block for this poll.
+    """
+    data = {}
+    for block in list(plan):
+        try:
+            result = await master.read_holding_registers(
+                address=block.address,
+                count=block.count,
+                priority=priority,
+                deadline=deadline)
+        except OperationDroppedError as e:
+            _LOGGER.debug(f"Modbus block read at {block.address:#06x} skipped: {e}")
+            continue
+        if (result is not None and result.isError() and len(block.registers) > 1 and
+                getattr(result, "exception_code", None) == MODBUS_EXCEPTION_ILLEGAL_ADDRESS):
+            _LOGGER.warning(f"Modbus block read at {block.address:#06x} rejected, split into single reads")
+            singles = block.split()
+            if block in plan:
+                index = plan.index(block)
+                plan[index:index + 1] = singles
+            data.update(await async_read_plan(master, singles, priority, deadline))
+        elif result is None or result.isError() or len(result.registers) != block.count:
+            _LOGGER.error(f"Modbus read error at {block.address:#06x} count={block.count}")
+            data.update((register, None) for register, _ in block.registers)
+        else:
+            data.update(block.slice(result.registers))
+    return data
+
+
+@callback
+def async_setup_adaptive_polling(config_entry, coordinators) -> None:
+    """ Drive adaptive groups from burner status and modulation """
+    adaptive = [coordinator for coordinator in coordinators if coordinator.adaptive]
+    source = next(
+        (coordinator for coordinator in coordinators if REG_R_BURNER_STATUS in coordinator.registers), None)
+    if not adaptive or source is None:
+        return
+
+    @callback
+    def _handle_burner_update() -> None:
+        if not source.data:
+            return
+        status = source.data.get(REG_R_BURNER_STATUS)
+        modulation = source.data.get(REG_R_BURNER_MODULATION)
+        active = bool(
+            (status is not None and status.value & BURNER_STATUS_ON) or
+            (modulation is not None and modulation.value))
+        for coordinator in adaptive:
+            coordinator.async_set_burner_active(active)
+
+    config_entry.async_on_unload(source.async_add_listener(_handle_burner_update))
+
+
+@callback
+def async_setup_shadow_invalidation(config_entry, master, coordinators) -> None:
+    """ Forget acknowledged write values on adapter reboot or boiler connectivity loss """
+    for coordinator in coordinators:
+        if REG_R_ADAPTER_STATUS in coordinator.registers:
+            config_entry.async_on_unload(coordinator.async_add_listener(
+                _shadow_status_listener(master, coordinator)))
+        if REG_R_ADAPTER_UPTIME in coordinator.registers:
+            config_entry.async_on_unload(coordinator.async_add_listener(
+                _shadow_uptime_listener(master, coordinator)))
+
+
+def _shadow_status_listener(master, coordinator):
+    @callback
+    def _handle_status_update() -> None:
+        status = coordinator.data.get(REG_R_ADAPTER_STATUS) if coordinator.data else None
+        if status is not None and not status.bits.get(ADAPTER_STATUS_CONNECTED):
+            master.invalidate_shadow("adapter is not connected")
+    return _handle_status_update
+
+
+def _shadow_uptime_listener(master, coordinator):
+    @callback
+    def _handle_uptime_update() -> None:
+        uptime = coordinator.data.get(REG_R_ADAPTER_UPTIME) if coordinator.data else None
+        if uptime is not None and uptime.value is not None:
+            master.invalidate_shadow("adapter rebooted", booted_at=time.monotonic() - uptime.value)
+    return _handle_uptime_update
@@ -0,0 +1,90 @@
+""" Precompiled register decoders """
+import logging
+import struct
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from .registers import BYTE_TYPES, REG_TYPE_MAPPING
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class DecodedRegister(NamedTuple):
+    """ Register value decoded once per refresh and shared by all entities """
+    raw: List[int]
+    value: Any
+    bits: Dict[int, Any]  # bitmask -> extracted value
+    converted: Dict[str, Any]  # converter name -> converted value
+
+
+def mask_shift(mask: int) -> int:
+    """ Position of the lowest set bit of the mask """
+    return (mask & -mask).bit_length() - 1
+
+
+class RegisterDecoder:
+    """ Decode plan for one register, compiled once from the register config """
+
+    __slots__ = ("register_addr", "count", "scale", "bitmasks", "converters", "_words", "_value", "_offset")
+
+    def __init__(self, register_addr: int, register_config: dict, bitmasks=(), converters=()):
+        data_type = register_config.get("data_type")
+        self.register_addr = register_addr
+        self.count = register_config.get("count", 1)
+        self.scale = register_config.get("scale", 1.0)
+
+        # (mask, shift, is_binary) for each bitmask descriptor
+        self.bitmasks = tuple((bitmask.mask, bitmask.shift, bitmask.is_binary) for bitmask in bitmasks)
+        self.converters = tuple((converter.key, converter.converter) for converter in converters)
+
+        # Raw register value without conversion
+        self._words = self._value = None
+        self._offset = 0
+        if not data_type:
+            return
+
+        if data_type not in REG_TYPE_MAPPING:
+            raise ValueError(f"Unknown data type '{data_type}' for register {register_addr:#06x}")
+
+        # Check config count for one byte values
+        if data_type in BYTE_TYPES and self.count > 1:
+            raise ValueError(
+                f"Invalid configuration for register {register_addr:#06x}: "
+                f"8-bit data types require count=1, got count={self.count}")
+
+        self._words = struct.Struct(f'>{self.count}H')
+        self._value = struct.Struct(f'>{REG_TYPE_MAPPING[data_type]}')
+        if data_type in BYTE_TYPES:
+            self._offset = 1  # low byte of the register
+        elif self._value.size != self._words.size:
+            raise ValueError(
+                f"Invalid configuration for register {register_addr:#06x}: "
+                f"'{data_type}' requires count={self._value.size // 2}, got count={self.count}")
+
+    def decode(self, registers: List[int]):
+        """ Convert raw register values to the scaled value """
+        if self._value is None:
+            return registers[0] if registers else None
+
+        value = self._value.unpack_from(self._words.pack(*registers), self._offset)[0]
+
+        # Apply scaling if needed
+        if self.scale != 1.0:
+            value *= self.scale
+
+        return value
+
+    def decode_register(self, registers: List[int]) -> Optional[DecodedRegister]:
+        """ Decode value, bitfields and converted values at once """
+        try:
+            value = self.decode(registers)
+            bits = {}
+            converted = {}
+            if value is not None:
+                for mask, shift, is_binary in self.bitmasks:
+                    bits[mask] = bool(value & mask) if is_binary else (value & mask) >> shift
+                for conv_name, converter in self.converters:
+                    converted[conv_name] = converter(value)
+            return DecodedRegister(registers, value, bits, converted)
+        except Exception as e:
+            _LOGGER.error("Error converting register %s data: %s", self.register_addr, e)
+            return None
@@ -0,0 +1,21 @@
+""" Diagnostics support for ectoControl Adapter """
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, OPT_HOST
+
+TO_REDACT = {OPT_HOST}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, config_entry: ConfigEntry) -> dict:
+    """ Return diagnostics for a config entry """
+    data = hass.data[DOMAIN][config_entry.entry_id]
+    master_coordinator = data["master_coordinator"]
+
+    return {
+        "config": async_redact_data(dict(config_entry.options or config_entry.data), TO_REDACT),
+        "setup_timings": data["setup_timings"],
+        "scheduler": data["scheduler"].diagnostics,
+        "master": master_coordinator.diagnostics
+    }
@@ -1,32 +1,36 @@
-from pymodbus import FramerType
-from pymodbus.client import (
-    AsyncModbusSerialClient,
-    AsyncModbusTcpClient,
-    AsyncModbusUdpClient
-)
-
 from .const import *  # noqa F403
 
 
 def create_modbus_client(config_data):
     """ Returns a Modbus client instance based on the `config_data` """
+    # pymodbus is loaded with the first client, not with the integration
+    from pymodbus import FramerType
+    from pymodbus.client import AsyncModbusSerialClient, AsyncModbusTcpClient, AsyncModbusUdpClient
+
+    # Automatic pymodbus reconnects are disabled, see ModbusConnection
     if config_data[OPT_MODBUS_TYPE] == MODBUS_TYPE_TCP:
         return AsyncModbusTcpClient(
             host=config_data[OPT_HOST],
             port=int(config_data[OPT_PORT]),
-            timeout=int(config_data[OPT_RESPONSE_TIMEOUT])
+            timeout=int(config_data[OPT_RESPONSE_TIMEOUT]),
+            retries=REQUEST_RETRIES,
+            reconnect_delay=0
         )
     elif config_data[OPT_MODBUS_TYPE] == MODBUS_TYPE_UDP:
         return AsyncModbusUdpClient(
             host=config_data[OPT_HOST],
             port=int(config_data[OPT_PORT]),
-            timeout=int(config_data[OPT_RESPONSE_TIMEOUT])
+            timeout=int(config_data[OPT_RESPONSE_TIMEOUT]),
+            retries=REQUEST_RETRIES,
+            reconnect_delay=0
         )
     elif config_data[OPT_MODBUS_TYPE] == MODBUS_TYPE_RTU_OVER_TCP:
         return AsyncModbusTcpClient(
             host=config_data[OPT_HOST],
             port=int(config_data[OPT_PORT]),
             timeout=int(config_data[OPT_RESPONSE_TIMEOUT]),
+            retries=RTU_REQUEST_RETRIES,
+            reconnect_delay=0,
             framer=FramerType.RTU
         )
     elif config_data[OPT_MODBUS_TYPE] == MODBUS_TYPE_SERIAL:
@@ -36,5 +40,7 @@ def create_modbus_client(config_data):
             bytesize=int(config_data[OPT_BYTESIZE]),
             parity=config_data[OPT_PARITY],
             stopbits=int(config_data[OPT_STOPBITS]),
-            timeout=int(config_data[OPT_RESPONSE_TIMEOUT])
+            timeout=int(config_data[OPT_RESPONSE_TIMEOUT]),
+            retries=RTU_REQUEST_RETRIES,
+            reconnect_delay=0
         )
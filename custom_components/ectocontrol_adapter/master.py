@@ -1,188 +1,289 @@
 import asyncio
 import logging
-from typing import Any, Dict, List
-
-from .const import OPT_SLAVE, QUEUE_TIMEOUT
-from .helpers import create_modbus_client
-from .registers import (
-    REG_DEFAULT_MAX_RETRIES,
-    REG_DEFAULT_RETRY_DELAY,
-    REG_STATUS_OFFSET,
-    REG_STATUS_OK
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from .breaker import CircuitBreaker, CircuitOpenError
+from .const import (
+    DEFAULT_SKIP_REDUNDANT_WRITES,
+    OP_PRIORITY_FAST_POLL,
+    OP_PRIORITY_RESYNC,
+    OP_PRIORITY_WRITE,
+    OPT_SKIP_REDUNDANT_WRITES,
+    OPT_SLAVE
 )
+from .operations import Operation
+from .resync import ResyncEngine
+from .transport import async_acquire_transport, async_release_transport
 
 _LOGGER = logging.getLogger(__name__)
 
 
 class ModbusMasterCoordinator:
-    """ Main coordinator for managing all Modbus operations """
+    """
+    Main coordinator for managing all Modbus operations of one adapter.
+
+    Operations are executed by the transport of the adapter bus, which is
+    shared by all config entries on the same serial line or gateway.
+    """
 
     def __init__(self, hass, config_entry):
         self.hass = hass
         self.config_entry = config_entry
         self._config = config_entry.options or config_entry.data
-        self._client = None
-        self._queue = asyncio.Queue()
-        self._processing_task = None
+        self._slave = int(self._config[OPT_SLAVE])
+        self._transport = None
         self._is_running = False
-        self._current_operation = None
-        self._operation_lock = asyncio.Lock()
+        self._resync = ResyncEngine(self)
+
+        # Operations fail at once while the adapter does not respond
+        self._breaker = CircuitBreaker(config_entry.title, on_open=self._fail_queued)
+
+        # Identical reads queued or executing: (address, count) -> operation
+        self._inflight_reads = {}
+        self._reads_saved = 0
+
+        # Queued coalescable writes: (address, count, status_register) -> operation
+        self._queued_writes = {}
+        self._writes_superseded = 0
+
+        # Last verified values of written registers: address -> (value, acknowledged at)
+        self._shadow = {}
+        self._skip_redundant_writes = self._config.get(OPT_SKIP_REDUNDANT_WRITES, DEFAULT_SKIP_REDUNDANT_WRITES)
+        self._writes_skipped = 0
 
     async def async_start(self):
+        self._transport = await async_acquire_transport(self.hass, self._config)
+        self._transport.set_outcome_listener(self._slave, self._breaker.record)
         self._is_running = True
-        self._processing_task = asyncio.create_task(self._process_queue())
         _LOGGER.info("Modbus master coordinator: STARTED")
 
     async def async_stop(self):
         self._is_running = False
-        if self._processing_task:
-            self._processing_task.cancel()
-            try:
-                await self._processing_task
-            except asyncio.CancelledError:
-                pass
-            self._processing_task = None
-
-        # Close Modbus connection
-        if self._client:
-            self._client.close()
+        self._resync.cancel()
+        if self._transport:
+            self._transport.remove_outcome_listener(self._slave)
+            await async_release_transport(self.hass, self._transport)
+            self._transport = None
 
         _LOGGER.info("Modbus master coordinator: STOPPED")
 
-    async def _connect(self):
-        """ Connecto to Modbus slave """
-        try:
-            self._client = create_modbus_client(self._config)
-            result = await self._client.connect()
-            if not result:
-                _LOGGER.error("Failed to connect to Modbus device")
-        except Exception as e:
-            _LOGGER.error(f"Error connecting to Modbus: {e}")
-
-    async def _get_modbus_client(self):
-        """ Rreturn connected Modbus client """
-        if not self._client or not self._client.connected:
-            await self._connect()
-            if not self._client.connected:
-                raise Exception("Modbus device not connected")
-        return self._client
-
-    async def _process_queue(self):
-        """ The main loop for processing Modbus commands """
-        while self._is_running:
-            try:
-                operation_id, operation_type, operation_data, future = await asyncio.wait_for(
-                    self._queue.get(), timeout=QUEUE_TIMEOUT)
-
-                async with self._operation_lock:
-                    self._current_operation = operation_id
-                    try:
-                        result = await self._execute_operation(operation_type, operation_data)
-                        if not future.done():
-                            future.set_result(result)
-                    except Exception as e:
-                        if not future.done():
-                            future.set_exception(e)
-                        _LOGGER.error(f"Operation {operation_id} failed: {e}")
-                    finally:
-                        self._current_operation = None
-                        self._queue.task_done()
-
-            except asyncio.TimeoutError:
-                continue
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                _LOGGER.error(f"Unexpected error in queue processing: {e}")
-
-    async def _execute_operation(self, op: str, data: Dict[str, Any]):
-        """ Backend for execute same operation """
-        client = await self._get_modbus_client()
-
-        try:
-            if op == "read_holding_registers":
-                return await client.read_holding_registers(
-                    address=data["address"],
-                    count=data["count"],
-                    device_id=int(self._config[OPT_SLAVE])
-                )
-            elif op == "write_registers":
-                result = await client.write_registers(
-                    address=data["address"],
-                    values=data["values"],
-                    device_id=int(self._config[OPT_SLAVE])
-                )
-
-                status_register = (
-                    data["status_register"] or
-                    data["address"] + REG_STATUS_OFFSET
-                )
-
-                success = await self._verify_write_status(
-                    status_register,
-                    data.get("success_status", REG_STATUS_OK),
-                    data.get("max_retries", REG_DEFAULT_MAX_RETRIES),
-                    data.get("retry_delay", REG_DEFAULT_RETRY_DELAY)
-                )
-                return (success and result)
-            else:
-                raise ValueError(f"Unknown operation type: {op}")
-
-        except Exception as e:
-            _LOGGER.error(f"Error executing '{op}' operation: {e}")
-
-    async def _verify_write_status(
+    async def read_holding_registers(
+            self,
+            address: int,
+            count: int,
+            priority=OP_PRIORITY_FAST_POLL,
+            deadline: Optional[float] = None) -> Any:
+        """ Read registers, a read still queued after `deadline` (monotonic) is dropped unsent """
+        if not self._is_running:
+            raise RuntimeError("Modbus coordinator is not running")
+
+        # Attach to the identical read already queued or executing
+        key = (address, count)
+        operation = self._inflight_reads.get(key)
+        if operation is not None:
+            self._reads_saved += 1
+            self._transport.promote(operation, priority)
+            operation.extend_deadline(deadline)
+            _LOGGER.debug(f"Read address={address:#06x} count={count} joined operation {operation.name}")
+            return await asyncio.shield(operation.future)
+
+        operation = self._enqueue_operation(
+            "read_holding_registers", {"address": address, "count": count}, priority, deadline)
+        self._inflight_reads[key] = operation
+        operation.future.add_done_callback(lambda _: self._inflight_reads.pop(key, None))
+        return await asyncio.shield(operation.future)
+
+    async def write_registers(
             self,
-            status_register: int,
-            success_status: int,
-            max_retries: int,
-            retry_delay: float) -> bool:
-        """ Checks write status """
-        client = await self._get_modbus_client()
-
-        for attempt in range(max_retries):
-            try:
-                result = await client.read_holding_registers(
-                    address=status_register,
-                    device_id=int(self._config[OPT_SLAVE]))
-                if result is not None:
-                    if result.isError():
-                        _LOGGER.error(f"Modbus read status register={status_register:#06x} error")
-                    elif len(result.registers) and result.registers[0] == success_status:
-                        return True
-            except Exception as e:
-                _LOGGER.error(f"Attempt {attempt + 1} failed to read status register: {e}")
-
-            if attempt < max_retries - 1:
-                await asyncio.sleep(retry_delay)
-
-        return False
-
-    async def read_holding_registers(self, address: int, count: int) -> Any:
-        return await self._submit_operation(
-            "read_holding_registers", {"address": address, "count": count})
-
-    async def write_registers(self, address: int, values: List[int], status_register=None) -> bool:
-        return await self._submit_operation(
-            "write_registers", {"address": address, "values": values, "status_register": status_register})
-
-    async def _submit_operation(self, op: str, data: Dict[str, Any]):
+            address: int,
+            values: List[int],
+            status_register=None,
+            priority=OP_PRIORITY_WRITE,
+            coalesce=False,
+            force=False) -> bool:
+        """
+        Write registers and verify the status register.
+
+        With `coalesce` a newer value replaces a still queued write to the
+        same registers (last value wins), all waiters get the final outcome.
+        Values already acknowledged by the adapter are not written again
+        unless `force` is set.
+        """
+        if not self._is_running:
+            raise RuntimeError("Modbus coordinator is not running")
+
+        if not force and self._shadow_matches(address, values):
+            return True
+        self._shadow.pop(address, None)  # unknown until the write is verified
+
+        if not coalesce:
+            operation = self._enqueue_operation(
+                "write_registers",
+                {"address": address, "values": values, "status_register": status_register},
+                priority)
+            operation.future.add_done_callback(lambda _: self._update_shadow(operation))
+            return await operation.future
+
+        key = (address, len(values), status_register)
+        operation = self._queued_writes.get(key)
+        if operation is not None and self._transport.is_queued(operation):
+            self._writes_superseded += 1
+            _LOGGER.debug(
+                f"Write address={address:#06x} values={operation.data['values']} "
+                f"superseded by {values}")
+            operation.data["values"] = values
+            self._transport.promote(operation, priority)
+            return await asyncio.shield(operation.future)
+
+        operation = self._enqueue_operation(
+            "write_registers", {"address": address, "values": values, "status_register": status_register}, priority)
+        operation.future.add_done_callback(lambda _: self._update_shadow(operation))
+        self._queued_writes[key] = operation
+        operation.future.add_done_callback(
+            lambda _: self._queued_writes.pop(key, None) if self._queued_writes.get(key) is operation else None)
+        return await asyncio.shield(operation.future)
+
+    async def write_registers_block(
+            self,
+            address: int,
+            values: List[int],
+            priority=OP_PRIORITY_RESYNC) -> List[bool]:
+        """ Write consecutive registers at once, return verified status of each one """
+        success = await self._submit_operation(
+            "write_registers_block", {"address": address, "values": values}, priority)
+        for offset, value in enumerate(values):
+            if success and success[offset]:
+                self._shadow[address + offset] = ((value,), time.monotonic())
+        return success
+
+    async def async_resync(self, address: int, value: int, force=False) -> bool:
+        """ Restore register value, batched with other registers being restored """
+        if not force and self._shadow_matches(address, [value]):
+            return True
+        self._shadow.pop(address, None)
+        return await self._resync.async_write(address, value)
+
+    def _shadow_matches(self, address: int, values: List[int]) -> bool:
+        """ Value is already acknowledged by the adapter, count the skipped write """
+        if not self._skip_redundant_writes:
+            return False
+        shadow = self._shadow.get(address)
+        if shadow is None or shadow[0] != tuple(values):
+            return False
+        self._writes_skipped += 1
+        _LOGGER.debug(f"Write address={address:#06x} values={values} skipped, value already acknowledged")
+        return True
+
+    def _update_shadow(self, operation: Operation):
+        """ Remember verified write, forget the register if the write failed """
+        future = operation.future
+        if future.cancelled():
+            return
+        address = operation.data["address"]
+        if future.exception() is None and future.result():
+            self._shadow[address] = (tuple(operation.data["values"]), time.monotonic())
+        else:
+            self._shadow.pop(address, None)
+
+    def invalidate_shadow(self, reason: str, booted_at=None):
+        """
+        Forget acknowledged values, they must be written again.
+
+        With `booted_at` (monotonic time of the adapter boot) only values
+        acknowledged before the adapter restart are dropped.
+        """
+        stale = [
+            address for address, (_, acknowledged_at) in self._shadow.items()
+            if booted_at is None or acknowledged_at < booted_at
+        ]
+        if stale:
+            _LOGGER.debug(f"Forget acknowledged values of registers {[f'{a:#06x}' for a in stale]}: {reason}")
+            for address in stale:
+                del self._shadow[address]
+
+    async def _submit_operation(self, op: str, data: Dict[str, Any], priority: int):
         """ Adds a operation to the queue and waits for the result """
         if not self._is_running:
             raise RuntimeError("Modbus coordinator is not running")
 
-        operation_id = f"{op}_{id(data)}"
-        future = asyncio.Future()
+        operation = self._enqueue_operation(op, data, priority)
+        return await operation.future
+
+    def _enqueue_operation(
+            self, op: str, data: Dict[str, Any], priority: int, deadline: Optional[float] = None) -> Operation:
+        self._breaker.check()
+        operation = Operation(self._slave, op, data, priority, deadline)
+        self._transport.submit(operation)
+        return operation
 
-        await self._queue.put((operation_id, op, data, future))
-        return await future
+    def _fail_queued(self, error: CircuitOpenError):
+        """ Circuit breaker opened, waiting operations would only time out """
+        if self._transport:
+            failed = self._transport.fail_queued(self._slave, error)
+            if failed:
+                _LOGGER.debug(f"Failed {failed} queued operation(s) of slave {self._slave}: {error}")
 
     @property
     def current_operation(self) -> str:
         """ Return current operation ID """
-        return self._current_operation
+        return self._transport.current_operation if self._transport else None
 
     @property
     def queue_size(self) -> int:
         """ Current queue size """
-        return self._queue.qsize()
+        return self._transport.queue_size if self._transport else 0
+
+    @property
+    def reads_saved(self) -> int:
+        """ Number of reads served by an identical in-flight read """
+        return self._reads_saved
+
+    @property
+    def writes_superseded(self) -> int:
+        """ Number of queued writes replaced by a newer value """
+        return self._writes_superseded
+
+    @property
+    def writes_skipped(self) -> int:
+        """ Number of writes skipped because the value was already acknowledged """
+        return self._writes_skipped
+
+    @property
+    def trace_enabled(self) -> bool:
+        return self._transport is not None and self._transport.trace is not None
+
+    def set_trace(self, enabled: bool):
+        """ Turn the transaction trace of the shared bus on or off """
+        if self._transport:
+            self._transport.set_trace(enabled)
+
+    def add_trace_listener(self, listener: Callable[[], None]) -> Callable[[], None]:
+        """ Call `listener` when the trace of the shared bus is turned on or off by any adapter """
+        if self._transport is None:
+            return lambda: None
+        return self._transport.add_trace_listener(listener)
+
+    @property
+    def bus_sensor_values(self) -> Dict[str, Any]:
+        """ Performance metrics of the shared bus """
+        return self._transport.sensor_values if self._transport else {}
+
+    @property
+    def diagnostics(self) -> Dict[str, Any]:
+        """ Adapter and shared bus state for the diagnostics download """
+        return {
+            "slave": self._slave,
+            "reads_saved": self._reads_saved,
+            "writes_superseded": self._writes_superseded,
+            "writes_skipped": self._writes_skipped,
+            "breaker": self._breaker.diagnostics,
+            "shadow": {f"{address:#06x}": list(values) for address, (values, _) in self._shadow.items()},
+            "transport": self._transport.diagnostics if self._transport else None,
+            "trace": self._transport.trace.as_list() if self.trace_enabled else None
+        }
+
+    @property
+    def queue_wait_stats(self) -> Dict[str, Dict[str, float]]:
+        """ Queue wait time (seconds) per priority class on the shared bus """
+        return self._transport.queue_wait_stats if self._transport else {}
@@ -0,0 +1,206 @@
+""" Modbus bus performance metrics """
+import math
+import time
+from typing import Any, Dict, Optional
+
+from .const import METRICS_RATE_TAU, MODBUS_TYPE_TCP, MODBUS_TYPE_UDP, OP_PRIORITY_NAMES
+
+# Modbus frame overhead (bytes): MBAP header for TCP/UDP, unit ID and CRC for RTU
+_FRAME_OVERHEAD_MBAP = 7
+_FRAME_OVERHEAD_RTU = 3
+
+
+class Histogram:
+    """
+    Fixed memory histogram with log-spaced buckets.
+
+    Quantiles are interpolated inside the bucket, the relative error is
+    bounded by the bucket width (about 26 % with the default layout).
+    """
+
+    __slots__ = ("_min", "_log_min", "_log_step", "_counts", "count", "total", "max")
+
+    def __init__(self, min_value: float = 0.001, max_value: float = 60.0, buckets: int = 48):
+        self._min = min_value
+        self._log_min = math.log(min_value)
+        self._log_step = (math.log(max_value) - self._log_min) / buckets
+        self._counts = [0] * (buckets + 2)  # under- and overflow buckets
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value: float):
+        if value < self._min:
+            index = 0
+        else:
+            index = min(len(self._counts) - 1, 1 + int((math.log(value) - self._log_min) / self._log_step))
+        self._counts[index] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def _bucket_bounds(self, index: int):
+        if index == 0:
+            return 0.0, self._min
+        low = math.exp(self._log_min + (index - 1) * self._log_step)
+        if index == len(self._counts) - 1:
+            return low, max(low, self.max)
+        return low, math.exp(self._log_min + index * self._log_step)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self._counts):
+            if count and seen + count >= rank:
+                low, high = self._bucket_bounds(index)
+                return min(self.max, low + (high - low) * (rank - seen) / count)
+            seen += count
+        return self.max
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "avg": self.total / self.count if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "max": self.max if self.count else None
+        }
+
+
+class RateEwma:
+    """ Exponentially weighted moving average of an amount per second """
+
+    __slots__ = ("_tau", "_rate", "_pending", "_last")
+
+    def __init__(self, tau: float = METRICS_RATE_TAU):
+        self._tau = tau
+        self._rate = 0.0
+        self._pending = 0.0
+        self._last = time.monotonic()
+
+    def add(self, amount: float = 1.0):
+        self._pending += amount
+        self._tick()
+
+    def _tick(self):
+        now = time.monotonic()
+        elapsed = now - self._last
+        if elapsed < 1.0:
+            return
+        alpha = 1.0 - math.exp(-elapsed / self._tau)
+        self._rate += alpha * (self._pending / elapsed - self._rate)
+        self._pending = 0.0
+        self._last = now
+
+    @property
+    def rate(self) -> float:
+        self._tick()
+        return self._rate
+
+
+def frame_sizes(modbus_type: str, op: str, data: Dict[str, Any]):
+    """ Request and response size on the wire (bytes) of an operation """
+    overhead = _FRAME_OVERHEAD_MBAP if modbus_type in (MODBUS_TYPE_TCP, MODBUS_TYPE_UDP) else _FRAME_OVERHEAD_RTU
+    if "values" in data:
+        # FC16: function, address, count, byte count, values / function, address, count
+        return overhead + 6 + 2 * len(data["values"]), overhead + 5
+    # FC3: function, address, count / function, byte count, values
+    return overhead + 5, overhead + 2 + 2 * data["count"]
+
+
+class BusMetrics:
+    """ Per operation metrics of one Modbus transport """
+
+    def __init__(self, modbus_type: str):
+        self._modbus_type = modbus_type
+        self.queue_wait = Histogram()
+        self.latency = Histogram()
+        self.verification = Histogram()
+        self.operations = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.queue_high_water = 0
+        self.expired = 0
+        self.shed = 0
+        # Operations dropped unsent per priority class: [expired, shed]
+        self._dropped = {priority: [0, 0] for priority in OP_PRIORITY_NAMES}
+        self._ops_rate = RateEwma()
+        self._busy_rate = RateEwma()
+
+    def record_queue_depth(self, depth: int):
+        self.queue_high_water = max(self.queue_high_water, depth)
+
+    def record_dropped(self, priority: int, reason: str):
+        """ Operation expired in the queue or was shed on overload """
+        if reason == "expired":
+            self.expired += 1
+            self._dropped[priority][0] += 1
+        else:
+            self.shed += 1
+            self._dropped[priority][1] += 1
+
+    def record_operation(self, op: str, data: Dict[str, Any], latency: float, success: bool, timeout=False):
+        """ One request/response round trip on the bus """
+        self.operations += 1
+        self.latency.add(latency)
+        self._ops_rate.add()
+        self._busy_rate.add(latency)
+        sent, received = frame_sizes(self._modbus_type, op, data)
+        self.bytes_sent += sent
+        if success:
+            self.bytes_received += received
+        else:
+            self.errors += 1
+            if timeout:
+                self.timeouts += 1
+
+    @property
+    def ops_rate(self) -> float:
+        """ Operations per second """
+        return self._ops_rate.rate
+
+    @property
+    def utilization(self) -> float:
+        """ Share of time (%) the bus waits for a response """
+        return min(100.0, self._busy_rate.rate * 100.0)
+
+    @property
+    def sensor_values(self) -> Dict[str, Any]:
+        """ Values of the bus diagnostic sensors """
+        p50 = self.latency.quantile(0.5)
+        p95 = self.latency.quantile(0.95)
+        return {
+            "bus_latency_p50": round(p50 * 1000, 1) if p50 is not None else None,
+            "bus_latency_p95": round(p95 * 1000, 1) if p95 is not None else None,
+            "bus_ops_rate": round(self.ops_rate, 2),
+            "bus_queue_high_water": self.queue_high_water,
+            "bus_utilization": round(self.utilization, 1),
+            "bus_errors": self.errors,
+            "bus_timeouts": self.timeouts,
+            "bus_expired": self.expired,
+            "bus_shed": self.shed
+        }
+
+    @property
+    def diagnostics(self) -> Dict[str, Any]:
+        return {
+            "operations": self.operations,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "queue_high_water": self.queue_high_water,
+            "dropped": {
+                OP_PRIORITY_NAMES[priority]: {"expired": expired, "shed": shed}
+                for priority, (expired, shed) in self._dropped.items()
+            },
+            "ops_rate": self.ops_rate,
+            "utilization": self.utilization,
+            "queue_wait": self.queue_wait.as_dict(),
+            "latency": self.latency.as_dict(),
+            "verification": self.verification.as_dict()
+        }
@@ -1,6 +1,6 @@
 import logging
 
-from homeassistant.components.number import NumberEntity, NumberMode
+from homeassistant.components.number import NumberDeviceClass, NumberEntity, NumberMode
 from homeassistant.const import Platform
 from homeassistant.helpers import entity_registry
 from homeassistant.helpers.device_registry import DeviceInfo
@@ -9,7 +9,7 @@ from homeassistant.helpers.restore_state import RestoreEntity
 
 from .const import DOMAIN
 from .mixins import ModbusUniqIdMixin
-from .registers import NUMBER_INPUT, REG_DEFAULT_NUMBER_STEP
+from .register_index import write_registers_for
 
 _LOGGER = logging.getLogger(__name__)
 _SUBSCRIBE_ATTEMPTS_DELAY = 5
@@ -19,13 +19,11 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
     """ Set up number entities  """
     data = hass.data[DOMAIN][config_entry.entry_id]
     master_coordinator = data["master_coordinator"]
-    write_registers = data["write_registers"]
 
-    entities = []
-
-    for register, config in write_registers.items():
-        if config.get("input_type") == NUMBER_INPUT:
-            entities.append(ModbusNumber(hass, master_coordinator, register, config))
+    entities = [
+        ModbusNumber(hass, master_coordinator, register)
+        for register in write_registers_for(Platform.NUMBER)
+    ]
 
     async_add_entities(entities)
 
@@ -33,32 +31,29 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
 class ModbusNumber(ModbusUniqIdMixin, NumberEntity, RestoreEntity):
     """ Modbus Number entity """
 
-    def __init__(self, hass, master_coordinator, register_addr, register_config):
+    def __init__(self, hass, master_coordinator, register):
         self.hass = hass
         self.coordinator = master_coordinator
-        self.register_addr = register_addr
-        self.register_config = register_config
+        self.register = register
+        self.register_addr = register.address
+        self.register_config = register.config
 
         self._attr_mode = NumberMode.BOX
         self._attr_has_entity_name = True
-        self._attr_translation_key = self.register_config.get("name")
-        self._attr_unique_id = f"{self._unique_id_prefix}_{self._attr_translation_key}_{register_addr:#06x}"
-
-        self._attr_native_min_value = register_config["min_value"]
-        self._attr_native_max_value = register_config["max_value"]
-        self._attr_native_value = register_config.get("initial_value")
-        self._attr_native_step = register_config.get("step", REG_DEFAULT_NUMBER_STEP)
-        self._attr_native_unit_of_measurement = register_config.get("unit_of_measurement")
-        self._attr_device_class = register_config.get("device_class")
-        self._attr_entity_category = register_config.get("category")
-
-        # Write after turn on
-        self.write_after_connected = None
-        if (
-                "write_after_connected" in register_config and
-                isinstance(register_config["write_after_connected"], tuple) and
-                len(register_config["write_after_connected"]) == 2):
-            self.write_after_connected = self.register_config["write_after_connected"]
+        self._attr_translation_key = register.name
+        self._attr_unique_id = f"{self._unique_id_prefix}_{register.unique_suffix}"
+
+        self._attr_native_min_value = self.register_config["min_value"]
+        self._attr_native_max_value = self.register_config["max_value"]
+        self._attr_native_value = self.register_config.get("initial_value")
+        self._attr_native_step = register.step
+        self._attr_native_unit_of_measurement = self.register_config.get("unit_of_measurement")
+        self._attr_device_class = NumberDeviceClass(register.device_class) if register.device_class else None
+        self._attr_entity_category = register.category
+        self._attr_icon = register.icon
+
+        # Write after turn on, (sensor register, sensor name) checked by the register index
+        self.write_after_connected = register.write_after_connected
 
         # Device info
         self._attr_device_info = DeviceInfo(
@@ -75,11 +70,11 @@ class ModbusNumber(ModbusUniqIdMixin, NumberEntity, RestoreEntity):
 
             # Subscribe to binary sensor updates and component loaded event
             if self.write_after_connected is not None:
-                # Write register immediatly
+                # Write register immediatly, batched with other restored registers
                 _LOGGER.debug(
                     f"'{self._attr_translation_key}' added to HA. "
                     f"Write last state to register={self.register_addr:#06x}")
-                await self.async_set_native_value(value=float(last_state.state))
+                self.hass.async_create_task(self._async_restore_value(float(last_state.state)))
 
         # Subscribe to adapter connected event
         if self.write_after_connected is not None:
@@ -91,13 +86,19 @@ class ModbusNumber(ModbusUniqIdMixin, NumberEntity, RestoreEntity):
 
     async def async_set_native_value(self, value: float) -> None:
         """ Set value via write coordinator """
+        await self._async_write_value(value)
+
+    async def _async_write_value(self, value: float, resync=False) -> None:
+        """ Write value to register, `resync` writes are batched by the master """
         intval = wrval = int(value)
-        scale = self.register_config.get("scale")
-        if scale is not None and scale > 0:
-            wrval *= scale  # real write value
+        if self.register.scale is not None:
+            wrval *= self.register.scale  # real write value
 
-        success = await self.coordinator.write_registers(
-            address=self.register_addr, values=[wrval])
+        if resync:
+            success = await self.coordinator.async_resync(self.register_addr, wrval)
+        else:
+            success = await self.coordinator.write_registers(
+                address=self.register_addr, values=[wrval], coalesce=True)
 
         if success:
             self._attr_native_value = intval
@@ -106,6 +107,13 @@ class ModbusNumber(ModbusUniqIdMixin, NumberEntity, RestoreEntity):
         else:
             raise Exception(f"Failed to write value '{intval}' to register={self.register_addr:#06x}")
 
+    async def _async_restore_value(self, value: float) -> None:
+        """ Restore register value after (re)connect """
+        try:
+            await self._async_write_value(value, resync=True)
+        except Exception as e:
+            _LOGGER.error(f"Restore of '{self._attr_translation_key}' failed: {e}")
+
     def _subscribe_with_retry(self, attempt=1, max_attempts=10):
         """ Subscribe to binary sensor updates (i.e. connectivity) """
         sensor_addr, sensor_name = self.write_after_connected
@@ -149,7 +157,7 @@ class ModbusNumber(ModbusUniqIdMixin, NumberEntity, RestoreEntity):
             write_value = float(last_state.state)
 
         if write_value is not None:
-            await self.async_set_native_value(value=write_value)
+            await self._async_restore_value(write_value)
 
     @property
     def assumed_state(self) -> bool:
@@ -158,7 +166,3 @@ class ModbusNumber(ModbusUniqIdMixin, NumberEntity, RestoreEntity):
     @property
     def should_poll(self) -> bool:
         return False
-
-    @property
-    def icon(self):
-        return self.register_config.get("icon")
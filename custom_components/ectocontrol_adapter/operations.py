@@ -0,0 +1,186 @@
+""" Modbus operations and priority queue """
+import asyncio
+import itertools
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional
+
+from .const import (
+    OP_PRIORITY_MAX_WAIT,
+    OP_PRIORITY_NAMES,
+    OP_PRIORITY_QUEUE_LIMIT,
+    OP_PRIORITY_SHED_ORDER,
+    OP_QUEUE_LIMIT
+)
+
+# Operation IDs, monotonic for the process lifetime
+_operation_ids = itertools.count(1)
+
+
+class OperationDroppedError(Exception):
+    """ Operation was dropped from the queue without reaching the bus """
+
+
+class Operation:
+    """ Queued Modbus operation, dropped unsent after its deadline (monotonic, None never) """
+
+    __slots__ = ("id", "slave", "op", "data", "priority", "future", "enqueued_at", "deadline")
+
+    def __init__(self, slave: int, op: str, data: Dict[str, Any], priority: int, deadline: Optional[float] = None):
+        self.id = next(_operation_ids)
+        self.slave = slave
+        self.op = op
+        self.data = data
+        self.priority = priority
+        self.future = asyncio.get_running_loop().create_future()
+        self.enqueued_at = time.monotonic()
+        self.deadline = deadline
+
+    @property
+    def name(self) -> str:
+        return f"{self.op}#{self.id}"
+
+    def expired(self, now: float) -> bool:
+        return self.deadline is not None and now > self.deadline
+
+    def extend_deadline(self, deadline: Optional[float]):
+        """ A later request joined the operation, keep it until the later deadline """
+        if self.deadline is not None:
+            self.deadline = None if deadline is None else max(self.deadline, deadline)
+
+
+class OperationQueue:
+    """
+    Priority queue of Modbus operations.
+
+    Operations are served by priority class. Inside a class slaves sharing
+    the bus are served round-robin, FIFO per slave. To keep slow groups
+    progressing, a poll that waited longer than its class limit (see
+    `OP_PRIORITY_MAX_WAIT`) is served ahead of higher priorities.
+
+    The queue is bounded per class (`OP_PRIORITY_QUEUE_LIMIT`) and in total
+    (`OP_QUEUE_LIMIT`). On overflow the oldest poll of the least valuable
+    class is shed (see `OP_PRIORITY_SHED_ORDER`), writes are never shed but
+    rejected while their class is full.
+    """
+
+    def __init__(self):
+        # priority -> slave -> operations
+        self._queues = {priority: OrderedDict() for priority in sorted(OP_PRIORITY_NAMES)}
+        self._size = 0
+        self._not_empty = asyncio.Event()
+
+    def put_nowait(self, operation: Operation) -> List[Operation]:
+        """ Queue the operation, return the operations shed to make room """
+        shed = []
+        if self._class_size(operation.priority) >= OP_PRIORITY_QUEUE_LIMIT[operation.priority]:
+            shed.append(self._shed(operation, (operation.priority,)))
+        elif self._size >= OP_QUEUE_LIMIT:
+            shed.append(self._shed(
+                operation, [priority for priority in OP_PRIORITY_SHED_ORDER if priority >= operation.priority]))
+        self._append(operation)
+        return shed
+
+    def _shed(self, operation: Operation, priorities) -> Operation:
+        """ Remove the oldest operation of the first non-empty sheddable class """
+        for priority in priorities:
+            slaves = self._queues[priority]
+            if priority in OP_PRIORITY_SHED_ORDER and slaves:
+                victim = min((queue[0] for queue in slaves.values()), key=lambda op: op.enqueued_at)
+                self._remove(victim)
+                return victim
+        raise OperationDroppedError(
+            f"Operation {operation.name} rejected, '{OP_PRIORITY_NAMES[operation.priority]}' queue is full")
+
+    def _append(self, operation: Operation):
+        slaves = self._queues[operation.priority]
+        if operation.slave not in slaves:
+            slaves[operation.slave] = deque()
+        slaves[operation.slave].append(operation)
+        self._size += 1
+        self._not_empty.set()
+
+    def requeue(self, operation: Operation):
+        """ Queue follow-up of an admitted operation, not bounded """
+        self._append(operation)
+
+    def promote(self, operation: Operation, priority: int) -> bool:
+        """ Move a still queued operation to a higher priority class """
+        if priority >= operation.priority:
+            return False
+        if not self._remove(operation):
+            return False  # already dequeued
+        operation.priority = priority
+        self._append(operation)
+        return True
+
+    def is_queued(self, operation: Operation) -> bool:
+        """ Operation is waiting in the queue and not dequeued yet """
+        queue = self._queues[operation.priority].get(operation.slave)
+        return queue is not None and operation in queue
+
+    def drain(self, slave: int) -> List[Operation]:
+        """ Remove and return all queued operations of the slave """
+        drained = []
+        for slaves in self._queues.values():
+            queue = slaves.pop(slave, None)
+            if queue:
+                drained.extend(queue)
+        self._size -= len(drained)
+        return drained
+
+    def _remove(self, operation: Operation) -> bool:
+        if not self.is_queued(operation):
+            return False
+        slaves = self._queues[operation.priority]
+        queue = slaves[operation.slave]
+        queue.remove(operation)
+        if not queue:
+            del slaves[operation.slave]
+        self._size -= 1
+        return True
+
+    async def get(self) -> Operation:
+        while not self._size:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        return self._pop()
+
+    def _pop(self) -> Operation:
+        now = time.monotonic()
+        selected = selected_at = None
+        for priority, slaves in self._queues.items():
+            if not slaves:
+                continue
+            oldest = min(queue[0].enqueued_at for queue in slaves.values())
+            if selected is None:
+                selected, selected_at = slaves, oldest
+                continue
+
+            # Starving lower priority operation
+            max_wait = OP_PRIORITY_MAX_WAIT.get(priority)
+            if max_wait is not None and now - oldest >= max_wait and oldest < selected_at:
+                selected, selected_at = slaves, oldest
+
+        # Round-robin between slaves of the class
+        slave, queue = next(iter(selected.items()))
+        operation = queue.popleft()
+        if queue:
+            selected.move_to_end(slave)
+        else:
+            del selected[slave]
+
+        self._size -= 1
+        return operation
+
+    def qsize(self) -> int:
+        return self._size
+
+    def _class_size(self, priority: int) -> int:
+        return sum(len(queue) for queue in self._queues[priority].values())
+
+    def qsize_by_priority(self) -> Dict[int, int]:
+        return {
+            priority: sum(len(queue) for queue in slaves.values())
+            for priority, slaves in self._queues.items()
+        }
@@ -0,0 +1,72 @@
+""" Modbus read planner """
+import logging
+from typing import Dict, Iterable, List, Tuple
+
+from .const import DEFAULT_READ_MAX_GAP
+from .registers import REG_MAX_READ_COUNT
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ReadBlock:
+    """ One FC3 request covering one or more registers """
+
+    __slots__ = ("address", "count", "registers")
+
+    def __init__(self, address: int, count: int, registers: List[Tuple[int, int]]):
+        self.address = address
+        self.count = count
+        self.registers = registers  # (register address, register count)
+
+    def slice(self, values: List[int]) -> Dict[int, List[int]]:
+        """ Split block read result back into per-register values """
+        if len(values) != self.count:
+            raise ValueError(f"Block read at {self.address:#06x} returned {len(values)} of {self.count} registers")
+        data = {}
+        for register, count in self.registers:
+            offset = register - self.address
+            data[register] = values[offset:offset + count]
+        return data
+
+    def split(self) -> List["ReadBlock"]:
+        """ One block per register """
+        return [ReadBlock(register, count, [(register, count)]) for register, count in self.registers]
+
+    def __repr__(self):
+        return f"ReadBlock(address={self.address:#06x}, count={self.count})"
+
+
+def build_read_plan(
+        registers: Iterable[Tuple[int, int]],
+        max_gap: int = DEFAULT_READ_MAX_GAP,
+        max_count: int = REG_MAX_READ_COUNT) -> List[ReadBlock]:
+    """
+    Merge (address, count) pairs into the fewest block reads.
+
+    Neighbouring registers are merged when the hole between them is not
+    larger than `max_gap` registers and the resulting block does not exceed
+    `max_count` registers (125 is the FC3 PDU limit).
+    """
+    plan = []
+    block = None
+    for address, count in sorted(set(registers)):
+        if count > max_count:
+            raise ValueError(
+                f"Register {address:#06x} count={count} exceeds block limit {max_count}")
+
+        if block is not None:
+            end = block.address + block.count
+            gap = address - end
+            if gap <= max_gap and address + count - block.address <= max_count:
+                block.count = max(end, address + count) - block.address
+                block.registers.append((address, count))
+                continue
+            plan.append(block)
+
+        block = ReadBlock(address, count, [(address, count)])
+
+    if block is not None:
+        plan.append(block)
+
+    _LOGGER.debug("Read plan: %s", plan)
+    return plan
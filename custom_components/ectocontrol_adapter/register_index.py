@@ -0,0 +1,221 @@
+""" Register map compiled once into immutable descriptors """
+from types import MappingProxyType
+from typing import Dict, Optional, Tuple
+
+from homeassistant.const import Platform
+
+from .decoder import RegisterDecoder, mask_shift
+from .registers import (
+    BM_BINARY,
+    BM_VALUE,
+    BUTTON_INPUT,
+    NUMBER_INPUT,
+    REGISTERS_R,
+    REGISTERS_W,
+    REG_DEFAULT_NUMBER_STEP,
+    REG_DEFAULT_SCAN_INTERVAL,
+    SELECT_INPUT,
+    SWITCH_INPUT
+)
+
+_WRITE_PLATFORMS = {
+    NUMBER_INPUT: Platform.NUMBER,
+    SELECT_INPUT: Platform.SELECT,
+    SWITCH_INPUT: Platform.SWITCH,
+    BUTTON_INPUT: Platform.BUTTON
+}
+
+
+class BitmaskDescriptor:
+    """ Value or flag stored in some bits of a read register """
+
+    __slots__ = (
+        "mask", "shift", "is_binary", "name", "platform", "unique_suffix",
+        "choices", "device_class", "category", "unit_of_measurement", "icon")
+
+    def __init__(self, register_addr: int, mask: int, config: dict):
+        if config.get("type") not in (BM_VALUE, BM_BINARY):
+            raise ValueError(f"Unknown bitmask type of {mask:#06x} in register {register_addr:#06x}")
+        self.mask = mask
+        self.shift = mask_shift(mask)
+        self.is_binary = config["type"] == BM_BINARY
+        self.name = config["name"]
+        self.platform = Platform.BINARY_SENSOR if self.is_binary else Platform.SENSOR
+        self.unique_suffix = f"{self.name}_{register_addr:#06x}"
+        self.choices = MappingProxyType(config["choices"]) if "choices" in config else None
+        self.device_class = config.get("device_class")
+        self.category = config.get("category")
+        self.unit_of_measurement = config.get("unit_of_measurement")
+        self.icon = config.get("icon")
+
+
+class ConverterDescriptor:
+    """ Sensor value derived from a read register by a converter function """
+
+    __slots__ = (
+        "key", "converter", "name", "unique_suffix", "device_class", "category", "unit_of_measurement", "icon")
+
+    def __init__(self, key: str, config: dict):
+        self.key = key
+        self.converter = config["converter"]
+        self.name = config["name"]
+        self.unique_suffix = f"{self.name}_{key}"
+        self.device_class = config.get("device_class")
+        self.category = config.get("category")
+        self.unit_of_measurement = config.get("unit_of_measurement")
+        self.icon = config.get("icon")
+
+
+class ReadRegister:
+    """ Read register with its decode plan, bitmasks and converters """
+
+    __slots__ = (
+        "address", "name", "count", "data_type", "scan_interval", "adaptive", "decoder",
+        "bitmasks", "converters", "unique_suffix", "choices", "device_class", "category",
+        "unit_of_measurement", "icon")
+
+    def __init__(self, address: int, config: dict):
+        self.address = address
+        self.name = config["name"]
+        self.count = config.get("count", 1)
+        self.data_type = config.get("data_type")
+        self.scan_interval = config.get("scan_interval", REG_DEFAULT_SCAN_INTERVAL)
+        self.adaptive = bool(config.get("adaptive"))
+        self.bitmasks = tuple(
+            BitmaskDescriptor(address, mask, mask_config)
+            for mask, mask_config in config.get("bitmasks", {}).items())
+        self.converters = tuple(
+            ConverterDescriptor(key, conv_config)
+            for key, conv_config in config.get("converters", {}).items())
+        self.decoder = RegisterDecoder(address, config, self.bitmasks, self.converters)
+        self.unique_suffix = f"{self.name}_{address:#06x}"
+        self.choices = MappingProxyType(config["choices"]) if "choices" in config else None
+        self.device_class = config.get("device_class")
+        self.category = config.get("category")
+        self.unit_of_measurement = config.get("unit_of_measurement")
+        self.icon = config.get("icon")
+
+        used = 0
+        for bitmask in self.bitmasks:
+            if not bitmask.mask or used & bitmask.mask:
+                raise ValueError(f"Bitmask {bitmask.mask:#06x} of register {address:#06x} is empty or overlaps")
+            used |= bitmask.mask
+
+    def bitmask(self, mask: int) -> Optional[BitmaskDescriptor]:
+        return next((bitmask for bitmask in self.bitmasks if bitmask.mask == mask), None)
+
+
+class ButtonDescriptor:
+    """ One value of a command register exposed as a button """
+
+    __slots__ = ("name", "value", "unique_suffix", "device_class", "category", "icon")
+
+    def __init__(self, register_addr: int, register_config: dict, config: dict):
+        if not isinstance(config.get("value"), int):
+            raise ValueError(f"Button '{config.get('name')}' of register {register_addr:#06x} has no integer value")
+        self.name = f"{register_config['name']}_{config['name']}"
+        self.value = config["value"]
+        self.unique_suffix = f"{self.name}_{register_addr:#06x}"
+        self.device_class = config.get("device_class") or register_config.get("device_class")
+        self.category = config.get("category") or register_config.get("category")
+        self.icon = config.get("icon") or register_config.get("icon")
+
+
+class WriteRegister:
+    """
+    Write register and the platform of its entity.
+
+    Attributes used on every write are precomputed, the rest of the
+    config stays available read-only as `config`.
+    """
+
+    __slots__ = (
+        "address", "name", "platform", "unique_suffix", "config", "scale", "step", "choices",
+        "status_register", "write_after_connected", "buttons", "device_class", "category", "icon")
+
+    def __init__(self, address: int, config: dict):
+        input_type = config.get("input_type")
+        if input_type not in _WRITE_PLATFORMS:
+            raise ValueError(f"Unknown input type '{input_type}' of register {address:#06x}")
+
+        self.address = address
+        self.name = config["name"]
+        self.platform = _WRITE_PLATFORMS[input_type]
+        self.unique_suffix = f"{self.name}_{address:#06x}"
+        self.config = MappingProxyType(config)
+        scale = config.get("scale")
+        self.scale = scale if scale is not None and scale > 0 else None
+        self.step = config.get("step", REG_DEFAULT_NUMBER_STEP)
+        self.choices = MappingProxyType(config["choices"]) if "choices" in config else None
+        self.status_register = config.get("status_register")
+        self.write_after_connected = config.get("write_after_connected")
+        self.buttons = tuple(ButtonDescriptor(address, config, button) for button in config.get("buttons", ()))
+        self.device_class = config.get("device_class")
+        self.category = config.get("category")
+        self.icon = config.get("icon")
+
+        if self.platform == Platform.NUMBER and ("min_value" not in config or "max_value" not in config):
+            raise ValueError(f"Number register {address:#06x} requires 'min_value' and 'max_value'")
+        if self.platform == Platform.SELECT and not self.choices:
+            raise ValueError(f"Select register {address:#06x} requires 'choices'")
+        if self.platform == Platform.SWITCH and ("on_value" not in config or "off_value" not in config):
+            raise ValueError(f"Switch register {address:#06x} requires 'on_value' and 'off_value'")
+        if self.platform == Platform.BUTTON and not self.buttons:
+            raise ValueError(f"Button register {address:#06x} requires 'buttons'")
+
+
+def _compile_read(registers: dict) -> Dict[int, ReadRegister]:
+    index = {}
+    covered = {}
+    for address, config in sorted(registers.items()):
+        register = ReadRegister(address, config)
+        for addr in range(address, address + register.count):
+            if addr in covered:
+                raise ValueError(f"Register {address:#06x} overlaps register {covered[addr]:#06x}")
+            covered[addr] = address
+        index[address] = register
+    return index
+
+
+def _compile_write(registers: dict, read_index: Dict[int, ReadRegister]) -> Dict[int, WriteRegister]:
+    index = {}
+    for address, config in sorted(registers.items()):
+        register = WriteRegister(address, config)
+        if register.write_after_connected is not None:
+            sensor_addr, sensor_name = register.write_after_connected
+            sensor = read_index.get(sensor_addr)
+            if sensor is None or all(bitmask.name != sensor_name for bitmask in sensor.bitmasks):
+                raise ValueError(
+                    f"Register {address:#06x} waits for unknown sensor '{sensor_name}' of {sensor_addr:#06x}")
+        index[address] = register
+    return index
+
+
+def _check_unique(read_index, write_index):
+    """ Unique ID suffixes must not repeat inside a platform """
+    seen = set()
+    entities = []
+    for register in read_index.values():
+        entities.append((Platform.SENSOR, register.unique_suffix))
+        entities.extend((bitmask.platform, bitmask.unique_suffix) for bitmask in register.bitmasks)
+        entities.extend((Platform.SENSOR, converter.unique_suffix) for converter in register.converters)
+    for register in write_index.values():
+        if register.platform == Platform.BUTTON:
+            entities.extend((Platform.BUTTON, button.unique_suffix) for button in register.buttons)
+        else:
+            entities.append((register.platform, register.unique_suffix))
+    for entity in entities:
+        if entity in seen:
+            raise ValueError(f"Duplicate {entity[0]} entity '{entity[1]}'")
+        seen.add(entity)
+
+
+def write_registers_for(platform: Platform) -> Tuple[WriteRegister, ...]:
+    """ Write registers represented by entities of `platform` """
+    return tuple(register for register in WRITE_REGISTERS.values() if register.platform == platform)
+
+
+# Compiled and validated at load, so invalid register configs fail early
+READ_REGISTERS = MappingProxyType(_compile_read(REGISTERS_R))
+WRITE_REGISTERS = MappingProxyType(_compile_write(REGISTERS_W, READ_REGISTERS))
+_check_unique(READ_REGISTERS, WRITE_REGISTERS)
@@ -1,14 +1,11 @@
-from homeassistant.components.binary_sensor import BinarySensorDeviceClass
-from homeassistant.components.button import ButtonDeviceClass
-from homeassistant.components.number import NumberDeviceClass
-from homeassistant.components.sensor import SensorDeviceClass
-from homeassistant.components.switch import SwitchDeviceClass  # noqa: F401
 from homeassistant.const import (
-    PERCENTAGE, UnitOfPressure, UnitOfTemperature, UnitOfTime, UnitOfVolumeFlowRate)
-from homeassistant.helpers.entity import EntityCategory
+    PERCENTAGE, EntityCategory, UnitOfPressure, UnitOfTemperature, UnitOfTime, UnitOfVolumeFlowRate)
 
 from .converters import uptime_to_boottime
 
+# Device classes are the string values of the platform DeviceClass enums, they are
+# converted by the entity platforms, so loading the register map does not import
+# the platform components
 
 # Register type maping for struct python module
 REG_TYPE_MAPPING = {
@@ -31,7 +28,7 @@ REG_TYPE_MAPPING = {
     'float64': 'd',
 }
 
-# Bitmasks value types
+# Bitmasks value types, BM_VALUE values are shifted down to the lowest bit of the mask
 BM_VALUE = 1
 BM_BINARY = 2
 
@@ -41,15 +38,28 @@ BYTE_TYPES = ['int8', 'uint8']
 # Default scan interval
 REG_DEFAULT_SCAN_INTERVAL = 15
 
-# Default max write retries
-REG_DEFAULT_MAX_RETRIES = 3
+# Max status register reads to verify one write
+REG_VERIFY_MAX_ATTEMPTS = 6
 
-# Default retry delay (float, seconds)
-REG_DEFAULT_RETRY_DELAY = 0.3
+# Backoff between status register reads, doubled after every attempt (float, seconds)
+REG_VERIFY_DELAY_MIN = 0.05
+REG_VERIFY_DELAY_MAX = 0.8
+
+# Max registers per one read request (Modbus PDU limit for FC3)
+REG_MAX_READ_COUNT = 125
+
+# Max registers per one write request (Modbus PDU limit for FC16)
+REG_MAX_WRITE_COUNT = 123
 
 # Default step for numbers
 REG_DEFAULT_NUMBER_STEP = 1.0
 
+# Burner status bit "burner is on"
+BURNER_STATUS_ON = 0b001
+
+# Adapter status bit "adapter is connected to the boiler"
+ADAPTER_STATUS_CONNECTED = 0x0800
+
 # Status register offset
 REG_STATUS_OFFSET = 0x30
 
@@ -115,18 +125,18 @@ REGISTERS_R = {
             0x0700: {
                 "type": BM_VALUE,
                 "name": "adapter_bus",
-                "device_class": SensorDeviceClass.ENUM,
+                "device_class": "enum",
                 "choices": {
-                    0b00000000000: "Opentherm",
-                    0b00100000000: "eBus",
-                    0b01000000000: "Navien"
+                    0b000: "Opentherm",
+                    0b001: "eBus",
+                    0b010: "Navien"
                 },
                 "icon": "mdi:alphabetical-variant"
             },
-            0x0800: {
+            ADAPTER_STATUS_CONNECTED: {
                 "type": BM_BINARY,
                 "name": "connectivity",
-                "device_class": BinarySensorDeviceClass.CONNECTIVITY
+                "device_class": "connectivity"
             }
         }
     },
@@ -145,7 +155,6 @@ REGISTERS_R = {
                 "icon": "mdi:github"
             },
             0xFF00: {
-                "rshift": 8,
                 "type": BM_VALUE,
                 "name": "adapter_hw_version",
                 "category": EntityCategory.DIAGNOSTIC,
@@ -160,13 +169,13 @@ REGISTERS_R = {
         "input_type": "holding",
         "scan_interval": 60,
         "unit_of_measurement": UnitOfTime.SECONDS,
-        "device_class": SensorDeviceClass.DURATION,
+        "device_class": "duration",
         "category": EntityCategory.DIAGNOSTIC,
         "converters": {
             "uptime_to_boottime": {
                 "converter": uptime_to_boottime,
                 "name": "adapter_boot_time",
-                "device_class": SensorDeviceClass.TIMESTAMP
+                "device_class": "timestamp"
             }
         }
     },
@@ -177,7 +186,7 @@ REGISTERS_R = {
         "input_type": "holding",
         "scan_interval": 60,
         "unit_of_measurement": UnitOfTemperature.CELSIUS,
-        "device_class": SensorDeviceClass.TEMPERATURE,
+        "device_class": "temperature",
         "category": EntityCategory.DIAGNOSTIC
     },
     REG_R_COOLANT_MAX_TEMP: {
@@ -187,7 +196,7 @@ REGISTERS_R = {
         "input_type": "holding",
         "scan_interval": 60,
         "unit_of_measurement": UnitOfTemperature.CELSIUS,
-        "device_class": SensorDeviceClass.TEMPERATURE,
+        "device_class": "temperature",
         "category": EntityCategory.DIAGNOSTIC
     },
     REG_R_DHW_MIN_TEMP: {
@@ -197,7 +206,7 @@ REGISTERS_R = {
         "input_type": "holding",
         "scan_interval": 60,
         "unit_of_measurement": UnitOfTemperature.CELSIUS,
-        "device_class": SensorDeviceClass.TEMPERATURE,
+        "device_class": "temperature",
         "category": EntityCategory.DIAGNOSTIC
     },
     REG_R_DHW_MAX_TEMP: {
@@ -207,7 +216,7 @@ REGISTERS_R = {
         "input_type": "holding",
         "scan_interval": 60,
         "unit_of_measurement": UnitOfTemperature.CELSIUS,
-        "device_class": SensorDeviceClass.TEMPERATURE,
+        "device_class": "temperature",
         "category": EntityCategory.DIAGNOSTIC
     },
     REG_R_COOLANT_TEMP: {
@@ -216,8 +225,9 @@ REGISTERS_R = {
         "data_type": "int16",
         "input_type": "holding",
         "scan_interval": 15,
+        "adaptive": True,
         "unit_of_measurement": UnitOfTemperature.CELSIUS,
-        "device_class": SensorDeviceClass.TEMPERATURE,
+        "device_class": "temperature",
         "scale": 0.1,
         "icon": "mdi:coolant-temperature"
     },
@@ -227,8 +237,9 @@ REGISTERS_R = {
         "data_type": "uint16",
         "input_type": "holding",
         "scan_interval": 15,
+        "adaptive": True,
         "unit_of_measurement": UnitOfTemperature.CELSIUS,
-        "device_class": SensorDeviceClass.TEMPERATURE,
+        "device_class": "temperature",
         "scale": 0.1,
         "icon": "mdi:thermometer-water"
     },
@@ -238,8 +249,9 @@ REGISTERS_R = {
         "data_type": "uint8",
         "input_type": "holding",
         "scan_interval": 15,
+        "adaptive": True,
         "unit_of_measurement": UnitOfPressure.BAR,
-        "device_class": SensorDeviceClass.PRESSURE,
+        "device_class": "pressure",
         "scale": 0.1
     },
     REG_R_CURRENT_VOLUME_FLOW_RATE: {
@@ -248,8 +260,9 @@ REGISTERS_R = {
         "data_type": "uint8",
         "input_type": "holding",
         "scan_interval": 15,
+        "adaptive": True,
         "unit_of_measurement": UnitOfVolumeFlowRate.LITERS_PER_MINUTE,
-        "device_class": SensorDeviceClass.VOLUME_FLOW_RATE,
+        "device_class": "volume_flow_rate",
         "scale": 0.1
     },
     REG_R_BURNER_MODULATION: {
@@ -259,7 +272,7 @@ REGISTERS_R = {
         "input_type": "holding",
         "scan_interval": 5,
         "unit_of_measurement": PERCENTAGE,
-        "device_class": SensorDeviceClass.POWER_FACTOR
+        "device_class": "power_factor"
     },
     REG_R_BURNER_STATUS: {
         "name": "burner_status_raw",
@@ -269,22 +282,22 @@ REGISTERS_R = {
         "scan_interval": 5,
         "category": EntityCategory.DIAGNOSTIC,
         "bitmasks": {
-            0b001: {
+            BURNER_STATUS_ON: {
                 "type": BM_BINARY,
                 "name": "burner_status",
-                "device_class": BinarySensorDeviceClass.RUNNING,
+                "device_class": "running",
                 "icon": "mdi:fire"
             },
             0b010: {
                 "type": BM_BINARY,
                 "name": "burner_heating",
-                "device_class": BinarySensorDeviceClass.RUNNING,
+                "device_class": "running",
                 "icon": "mdi:heating-coil"
             },
             0b100: {
                 "type": BM_BINARY,
                 "name": "burner_dhw",
-                "device_class": BinarySensorDeviceClass.RUNNING,
+                "device_class": "running",
                 "icon": "mdi:faucet"
             }
         }
@@ -312,7 +325,7 @@ REGISTERS_R = {
         "input_type": "holding",
         "scan_interval": 15,
         "unit_of_measurement": UnitOfTemperature.CELSIUS,
-        "device_class": SensorDeviceClass.TEMPERATURE,
+        "device_class": "temperature",
         "icon": "mdi:home-thermometer"
     },
     REG_R_VENDOR_CODE: {
@@ -342,37 +355,37 @@ REGISTERS_R = {
             0x0001: {
                 "type": BM_BINARY,
                 "name": "opentherm_maintenance_required",
-                "device_class": BinarySensorDeviceClass.PROBLEM,
+                "device_class": "problem",
                 "category": EntityCategory.DIAGNOSTIC
             },
             0x0002: {
                 "type": BM_BINARY,
                 "name": "opentherm_boiler_blocked",
-                "device_class": BinarySensorDeviceClass.PROBLEM,
+                "device_class": "problem",
                 "category": EntityCategory.DIAGNOSTIC
             },
             0x0004: {
                 "type": BM_BINARY,
                 "name": "opentherm_low_pressure",
-                "device_class": BinarySensorDeviceClass.PROBLEM,
+                "device_class": "problem",
                 "category": EntityCategory.DIAGNOSTIC
             },
             0x0008: {
                 "type": BM_BINARY,
                 "name": "opentherm_ignition_error",
-                "device_class": BinarySensorDeviceClass.PROBLEM,
+                "device_class": "problem",
                 "category": EntityCategory.DIAGNOSTIC
             },
             0x0010: {
                 "type": BM_BINARY,
                 "name": "opentherm_low_air_pressure",
-                "device_class": BinarySensorDeviceClass.PROBLEM,
+                "device_class": "problem",
                 "category": EntityCategory.DIAGNOSTIC
             },
             0x0020: {
                 "type": BM_BINARY,
                 "name": "opentherm_coolant_overheating",
-                "device_class": BinarySensorDeviceClass.PROBLEM,
+                "device_class": "problem",
                 "category": EntityCategory.DIAGNOSTIC
             }
         }
@@ -393,7 +406,7 @@ REGISTERS_W = {
     #     "off_value": 0,
     #     "input_type": SWITCH_INPUT,
     #     "icon": "mdi:alarm-panel-outline",
-    #     "device_class": SwitchDeviceClass.SWITCH
+    #     "device_class": "switch"
     # },
     # or Select
     REG_W_CONNECT_TYPE: {
@@ -417,7 +430,7 @@ REGISTERS_W = {
         "input_type": NUMBER_INPUT,
         "unit_of_measurement": UnitOfTemperature.CELSIUS,
         "icon": "mdi:coolant-temperature",
-        "device_class": NumberDeviceClass.TEMPERATURE,
+        "device_class": "temperature",
         "write_after_connected": (REG_R_ADAPTER_STATUS, "connectivity")
     },
     REG_W_COOLANT_EMERGENCY_TEMP: {
@@ -430,7 +443,7 @@ REGISTERS_W = {
         "input_type": NUMBER_INPUT,
         "unit_of_measurement": UnitOfTemperature.CELSIUS,
         "icon": "mdi:thermometer-alert",
-        "device_class": NumberDeviceClass.TEMPERATURE
+        "device_class": "temperature"
     },
     REG_W_COOLANT_MIN_TEMP: {
         "name": "coolant_min_temp",
@@ -441,7 +454,7 @@ REGISTERS_W = {
         "input_type": NUMBER_INPUT,
         "unit_of_measurement": UnitOfTemperature.CELSIUS,
         "icon": "mdi:thermometer-minus",
-        "device_class": NumberDeviceClass.TEMPERATURE,
+        "device_class": "temperature",
         "category": EntityCategory.CONFIG,
         "write_after_connected": (REG_R_ADAPTER_STATUS, "connectivity")
     },
@@ -454,7 +467,7 @@ REGISTERS_W = {
         "input_type": NUMBER_INPUT,
         "unit_of_measurement": UnitOfTemperature.CELSIUS,
         "icon": "mdi:thermometer-plus",
-        "device_class": NumberDeviceClass.TEMPERATURE,
+        "device_class": "temperature",
         "category": EntityCategory.CONFIG,
         "write_after_connected": (REG_R_ADAPTER_STATUS, "connectivity")
     },
@@ -467,7 +480,7 @@ REGISTERS_W = {
         "input_type": NUMBER_INPUT,
         "unit_of_measurement": UnitOfTemperature.CELSIUS,
         "icon": "mdi:thermometer-minus",
-        "device_class": NumberDeviceClass.TEMPERATURE,
+        "device_class": "temperature",
         "category": EntityCategory.CONFIG,
         "write_after_connected": (REG_R_ADAPTER_STATUS, "connectivity")
     },
@@ -480,7 +493,7 @@ REGISTERS_W = {
         "input_type": NUMBER_INPUT,
         "unit_of_measurement": UnitOfTemperature.CELSIUS,
         "icon": "mdi:thermometer-plus",
-        "device_class": NumberDeviceClass.TEMPERATURE,
+        "device_class": "temperature",
         "category": EntityCategory.CONFIG,
         "write_after_connected": (REG_R_ADAPTER_STATUS, "connectivity")
     },
@@ -493,7 +506,7 @@ REGISTERS_W = {
         "input_type": NUMBER_INPUT,
         "unit_of_measurement": UnitOfTemperature.CELSIUS,
         "icon": "mdi:thermometer-water",
-        "device_class": NumberDeviceClass.TEMPERATURE
+        "device_class": "temperature"
     },
     REG_W_BURNER_MODULATION: {
         "name": "burner_modulation",
@@ -504,7 +517,7 @@ REGISTERS_W = {
         "input_type": NUMBER_INPUT,
         "unit_of_measurement": PERCENTAGE,
         "icon": "mdi:gas-burner",
-        "device_class": NumberDeviceClass.POWER_FACTOR
+        "device_class": "power_factor"
     },
     REG_W_MODE: {
         "name": "work_mode",
@@ -529,13 +542,13 @@ REGISTERS_W = {
                 "name": "reboot",
                 "value": 2,
                 "icon": "mdi:reload",
-                "device_class": ButtonDeviceClass.RESTART,
+                "device_class": "restart",
             },
             {
                 "name": "reset_boiler_errors",
                 "value": 3,
                 "icon": "mdi:lock-reset",
-                "device_class": ButtonDeviceClass.RESTART,
+                "device_class": "restart",
             }
         ]
     }
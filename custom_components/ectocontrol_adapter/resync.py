@@ -0,0 +1,96 @@
+""" Batched restore of write-after-connected registers """
+import asyncio
+import logging
+from typing import Dict, List, Tuple
+
+from .const import RESYNC_COLLECT_DELAY
+from .registers import REG_MAX_WRITE_COUNT
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def contiguous_runs(values: Dict[int, int], max_count: int = REG_MAX_WRITE_COUNT) -> List[Tuple[int, List[int]]]:
+    """ Split {address: value} into (start address, values) runs of consecutive registers """
+    runs = []
+    for address in sorted(values):
+        if runs:
+            start, run = runs[-1]
+            if address == start + len(run) and len(run) < max_count:
+                run.append(values[address])
+                continue
+        runs.append((address, [values[address]]))
+    return runs
+
+
+class ResyncEngine:
+    """
+    Restores registers after adapter (re)connect or HA restart.
+
+    Values arriving within `RESYNC_COLLECT_DELAY` are collected and written
+    as contiguous runs with one FC16 request each, the matching status
+    registers are verified with one block read per run.
+    """
+
+    def __init__(self, master):
+        self._master = master
+        self._pending = {}  # address -> (value, [futures])
+        self._flush_task = None
+        self._sending = {}  # flush task -> batch being written
+
+    async def async_write(self, address: int, value: int) -> bool:
+        """ Queue register value for the next batched write, return write status """
+        future = asyncio.get_running_loop().create_future()
+        futures = self._pending[address][1] if address in self._pending else []
+        futures.append(future)
+        self._pending[address] = (value, futures)  # last value wins
+
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+
+        return await asyncio.shield(future)
+
+    async def _delayed_flush(self):
+        try:
+            await asyncio.sleep(RESYNC_COLLECT_DELAY)
+        except asyncio.CancelledError:
+            return  # waiters are resolved by cancel()
+
+        pending, self._pending = self._pending, {}
+        self._flush_task = None
+        task = asyncio.current_task()
+        self._sending[task] = pending
+
+        try:
+            for start, values in contiguous_runs({address: value for address, (value, _) in pending.items()}):
+                _LOGGER.debug(f"Resync registers {start:#06x}..{start + len(values) - 1:#06x}: {values}")
+                try:
+                    statuses = await self._master.write_registers_block(start, values)
+                except Exception as e:
+                    _LOGGER.error(f"Resync of registers from {start:#06x} failed: {e}")
+                    statuses = None
+
+                for offset in range(len(values)):
+                    self._resolve({start + offset: pending[start + offset]}, bool(statuses and statuses[offset]))
+        finally:
+            # Runs not written when cancelled fail, nobody waits forever
+            self._sending.pop(task, None)
+            self._resolve(pending, False)
+
+    def cancel(self):
+        """ Stop batching, waiters of values not written yet get False """
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        for task, pending in list(self._sending.items()):
+            task.cancel()
+            self._resolve(pending, False)
+        self._sending.clear()
+        pending, self._pending = self._pending, {}
+        self._resolve(pending, False)
+
+    @staticmethod
+    def _resolve(pending, success: bool):
+        for _, futures in pending.values():
+            for future in futures:
+                if not future.done():
+                    future.set_result(success)
@@ -0,0 +1,167 @@
+""" One poll timer for all scan groups of an adapter """
+import asyncio
+import logging
+import time
+from typing import Any, Dict
+
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import UpdateFailed
+
+from .const import DEFAULT_READ_MAX_GAP, OPT_READ_MAX_GAP, POLL_TICK_TOLERANCE
+from .coordinator import async_read_plan
+from .planner import build_read_plan
+from .register_index import READ_REGISTERS
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class PollScheduler:
+    """
+    Polls the ModbusDataUpdateCoordinator groups of one adapter.
+
+    Each group falls due on a grid of its poll interval anchored at start,
+    so groups with coinciding intervals are due at the same tick. All
+    registers due on a tick are read with one merged read plan and the
+    result is fanned out to the groups.
+    """
+
+    def __init__(self, config_entry, master, coordinators):
+        self._config = config_entry.options or config_entry.data
+        self._master = master
+        self._coordinators = tuple(coordinators)
+        self._max_gap = int(self._config.get(OPT_READ_MAX_GAP, DEFAULT_READ_MAX_GAP))
+        self._task = None
+        self._is_running = False
+        self._wakeup = asyncio.Event()
+
+        # Next due time of each group (monotonic)
+        self._anchor = None
+        self._due = {}
+
+        # Groups due together -> (merged read plan, priority)
+        self._plans = {}
+
+        self._ticks = 0
+        self._blocks = 0
+        self._dropped = 0
+
+        for coordinator in self._coordinators:
+            coordinator.scheduler = self
+
+    async def async_start(self):
+        """ Poll all groups with one merged read, then start the poll loop """
+        if not self._coordinators:
+            return
+
+        self._is_running = True
+        self._anchor = time.monotonic()
+        await self._async_poll(self._coordinators)
+        if not self._is_running:
+            return  # Stopped during the first poll
+
+        now = time.monotonic()
+        self._due = {
+            coordinator: self._next_due(coordinator.poll_interval, now)
+            for coordinator in self._coordinators
+        }
+        self._task = asyncio.create_task(self._async_run())
+        _LOGGER.info(f"Poll scheduler: STARTED, {len(self._coordinators)} scan groups")
+
+    async def async_stop(self):
+        self._is_running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        _LOGGER.info("Poll scheduler: STOPPED")
+
+    @callback
+    def async_reschedule(self, coordinator):
+        """ Poll interval of `coordinator` changed """
+        if coordinator not in self._due:
+            return
+        self._due[coordinator] = self._next_due(coordinator.poll_interval, time.monotonic())
+        self._wakeup.set()
+
+    def _next_due(self, interval: float, after: float) -> float:
+        """ First grid point of `interval` later than `after` """
+        return self._anchor + ((after - self._anchor) // interval + 1) * interval
+
+    async def _async_run(self):
+        while True:
+            now = time.monotonic()
+            next_due = min(self._due.values())
+            if next_due > now:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), next_due - now)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            due = {
+                coordinator: due_at for coordinator, due_at in self._due.items()
+                if due_at <= now + POLL_TICK_TOLERANCE
+            }
+            try:
+                await self._async_poll(tuple(due))
+            except Exception as e:
+                _LOGGER.error(f"Poll of registers failed: {e}")
+
+            # Missed grid points are skipped, not caught up
+            now = time.monotonic()
+            for coordinator, due_at in due.items():
+                self._due[coordinator] = self._next_due(coordinator.poll_interval, max(now, due_at))
+
+    async def _async_poll(self, coordinators):
+        key = frozenset(coordinators)
+        if key not in self._plans:
+            self._plans[key] = (
+                build_read_plan(
+                    [
+                        (register, READ_REGISTERS[register].count)
+                        for coordinator in coordinators for register in coordinator.registers
+                    ],
+                    max_gap=self._max_gap),
+                min(coordinator.priority for coordinator in coordinators))
+        plan, priority = self._plans[key]
+
+        # Reads not sent before the next tick of the fastest group are stale
+        deadline = time.monotonic() + min(coordinator.poll_interval for coordinator in coordinators)
+
+        self._ticks += 1
+        self._blocks += len(plan)
+        try:
+            data = await async_read_plan(self._master, plan, priority, deadline)
+        except Exception as e:
+            for coordinator in coordinators:
+                coordinator.async_set_update_error(UpdateFailed(f"Exception while Modbus read: {e}"))
+            return
+
+        # Bus overloaded, registers of dropped blocks keep their data until the next tick
+        if len(data) < sum(len(block.registers) for block in plan):
+            self._dropped += 1
+
+        for coordinator in coordinators:
+            coordinator.async_set_polled_data(data)
+
+    @property
+    def diagnostics(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "ticks": self._ticks,
+            "read_blocks": self._blocks,
+            "polls_dropped": self._dropped,
+            "groups": [
+                {
+                    "registers": [f"{register:#06x}" for register in coordinator.registers],
+                    "scan_interval": coordinator.scan_interval,
+                    "poll_interval": coordinator.poll_interval,
+                    "due_in": round(due_at - now, 3)
+                }
+                for coordinator, due_at in self._due.items()
+            ]
+        }
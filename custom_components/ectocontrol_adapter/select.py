@@ -1,12 +1,13 @@
 import logging
 
 from homeassistant.components.select import SelectEntity
+from homeassistant.const import Platform
 from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.restore_state import RestoreEntity
 
 from .const import DOMAIN
 from .mixins import ModbusUniqIdMixin
-from .registers import SELECT_INPUT
+from .register_index import write_registers_for
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -15,13 +16,11 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
     """ Set up select entities  """
     data = hass.data[DOMAIN][config_entry.entry_id]
     master_coordinator = data["master_coordinator"]
-    write_registers = data["write_registers"]
 
-    entities = []
-
-    for register, config in write_registers.items():
-        if config.get("input_type") == SELECT_INPUT:
-            entities.append(ModbusSelect(hass, master_coordinator, register, config))
+    entities = [
+        ModbusSelect(hass, master_coordinator, register)
+        for register in write_registers_for(Platform.SELECT)
+    ]
 
     async_add_entities(entities)
 
@@ -29,19 +28,20 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
 class ModbusSelect(ModbusUniqIdMixin, SelectEntity, RestoreEntity):
     """ Modbus Select entity """
 
-    def __init__(self, hass, master_coordinator, register_addr, register_config):
+    def __init__(self, hass, master_coordinator, register):
         self.hass = hass
         self.coordinator = master_coordinator
-        self.register_addr = register_addr
-        self.register_config = register_config
-        self.choices = register_config.get("choices")
+        self.register_addr = register.address
+        self.register_config = register.config
+        self.choices = register.choices
 
         self._attr_has_entity_name = True
-        self._attr_translation_key = self.register_config.get("name")
-        self._attr_unique_id = f"{self._unique_id_prefix}_{self._attr_translation_key}_{register_addr:#06x}"
+        self._attr_translation_key = register.name
+        self._attr_unique_id = f"{self._unique_id_prefix}_{register.unique_suffix}"
         self._attr_options = list(self.choices.keys())
-        self._attr_current_option = register_config.get("initial_value")
-        self._attr_entity_category = register_config.get("category")
+        self._attr_current_option = self.register_config.get("initial_value")
+        self._attr_entity_category = register.category
+        self._attr_icon = register.icon
 
         # Device info
         self._attr_device_info = DeviceInfo(
@@ -62,7 +62,7 @@ class ModbusSelect(ModbusUniqIdMixin, SelectEntity, RestoreEntity):
 
         wrval = self.choices[option]
         success = await self.coordinator.write_registers(
-            address=self.register_addr, values=[wrval])
+            address=self.register_addr, values=[wrval], coalesce=True)
 
         if success:
             self._attr_current_option = option
@@ -78,7 +78,3 @@ class ModbusSelect(ModbusUniqIdMixin, SelectEntity, RestoreEntity):
     @property
     def should_poll(self) -> bool:
         return False
-
-    @property
-    def icon(self):
-        return self.register_config.get("icon")
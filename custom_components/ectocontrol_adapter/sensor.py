@@ -1,15 +1,63 @@
 import logging
 
-from homeassistant.components.sensor import SensorEntity
+from homeassistant.components.sensor import SensorDeviceClass, SensorEntity, SensorStateClass
+from homeassistant.const import PERCENTAGE, EntityCategory, Platform, UnitOfTime
 from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from .const import DOMAIN
 from .mixins import ModbusSensorMixin, ModbusUniqIdMixin
-from .registers import BM_VALUE
 
 _LOGGER = logging.getLogger(__name__)
 
+# Performance metrics of the Modbus bus, see BusMetrics
+BUS_SENSORS = {
+    "bus_latency_p50": {
+        "unit_of_measurement": UnitOfTime.MILLISECONDS,
+        "state_class": SensorStateClass.MEASUREMENT,
+        "icon": "mdi:timer-outline"
+    },
+    "bus_latency_p95": {
+        "unit_of_measurement": UnitOfTime.MILLISECONDS,
+        "state_class": SensorStateClass.MEASUREMENT,
+        "icon": "mdi:timer-alert-outline"
+    },
+    "bus_ops_rate": {
+        "unit_of_measurement": "ops/s",
+        "state_class": SensorStateClass.MEASUREMENT,
+        "icon": "mdi:swap-horizontal"
+    },
+    "bus_queue_high_water": {
+        "state_class": SensorStateClass.MEASUREMENT,
+        "icon": "mdi:tray-full"
+    },
+    "bus_utilization": {
+        "unit_of_measurement": PERCENTAGE,
+        "state_class": SensorStateClass.MEASUREMENT,
+        "icon": "mdi:gauge"
+    },
+    "bus_errors": {
+        "state_class": SensorStateClass.TOTAL_INCREASING,
+        "icon": "mdi:alert-circle-outline"
+    },
+    "bus_timeouts": {
+        "state_class": SensorStateClass.TOTAL_INCREASING,
+        "icon": "mdi:timer-off-outline"
+    },
+    "bus_expired": {
+        "state_class": SensorStateClass.TOTAL_INCREASING,
+        "icon": "mdi:timer-sand-complete"
+    },
+    "bus_shed": {
+        "state_class": SensorStateClass.TOTAL_INCREASING,
+        "icon": "mdi:tray-remove"
+    },
+    "bus_reconnects": {
+        "state_class": SensorStateClass.TOTAL_INCREASING,
+        "icon": "mdi:lan-connect"
+    }
+}
+
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """ Set up sensors """
@@ -20,74 +68,52 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
     sensors = []
 
     # Create sensors for each coordinator
-    for scan_interval, coordinator in coordinators.items():
-        registers = register_groups[scan_interval]
+    for group, coordinator in coordinators.items():
+        registers = register_groups[group]
+
+        for register in registers:
+            sensors.append(ModbusSensor(coordinator, register))
 
-        for register, config in registers:
-            sensor = ModbusSensor(coordinator, register, config)
-            sensors.append(sensor)
+            for bitmask in register.bitmasks:
+                if bitmask.platform == Platform.SENSOR:
+                    sensors.append(ModbusSensor(coordinator, register, bitmask=bitmask))
 
-            if "bitmasks" in config:
-                for mask, mask_config in config["bitmasks"].items():
-                    if mask_config["type"] == BM_VALUE:
-                        sensor = ModbusSensor(coordinator, register, config, mask)
-                        sensors.append(sensor)
+            for converter in register.converters:
+                sensors.append(ModbusSensor(coordinator, register, converter=converter))
 
-            if "converters" in config:
-                for conv_name in config["converters"].keys():
-                    sensor = ModbusSensor(
-                        coordinator, register, config,
-                        bitmask=None, conv_name=conv_name)
-                    sensors.append(sensor)
+    # Bus performance sensors
+    for name, config in BUS_SENSORS.items():
+        sensors.append(ModbusBusSensor(data["master_coordinator"], name, config))
 
-    async_add_entities(sensors, True)
+    async_add_entities(sensors, update_before_add=False)
 
 
 class ModbusSensor(ModbusSensorMixin, ModbusUniqIdMixin, CoordinatorEntity, SensorEntity):
     """ Modbus Sensor. """
 
-    def __init__(self, coordinator, register_addr, register_config, bitmask=None, conv_name=None):
+    def __init__(self, coordinator, register, bitmask=None, converter=None):
         """ Initialize the sensor. """
-        super().__init__(coordinator)
-        self.register_addr = register_addr
-        self.register_config = register_config
-
-        self.bitmask = None
-        self.bitmask_config = {}
-        if isinstance(bitmask, int):
-            self.bitmask = bitmask
-            self.bitmask_config = register_config["bitmasks"][bitmask]
-
-        self.conv_name = conv_name
-        self.conv = None
-        self.conv_config = {}
-        if isinstance(conv_name, str):
-            self.conv_config = register_config["converters"][conv_name]
-            self.conv = self.conv_config["converter"]
+        # Coordinator notifies only when this register or bitmask changes
+        super().__init__(coordinator, context=(register.address, bitmask.mask if bitmask else None))
+        self.register = register
+        self.register_addr = register.address
+        self.bitmask = bitmask
+        self.converter = converter
+
+        # Descriptor of the displayed value
+        desc = bitmask or converter or register
 
         # Display values
-        self.choices = self.bitmask_config.get('choices') or self.register_config.get('choices')
+        self.choices = (bitmask and bitmask.choices) or register.choices
 
         # Entity attributes
         self._attr_has_entity_name = True
-        if self.bitmask is not None:
-            self._attr_translation_key = self.bitmask_config.get("name")
-            self._attr_unique_id = f"{self._unique_id_prefix}_{self._attr_translation_key}_{register_addr:#06x}"
-            self._attr_device_class = self.bitmask_config.get("device_class")
-            self._attr_entity_category = self.bitmask_config.get("category")
-            self._attr_native_unit_of_measurement = self.bitmask_config.get("unit_of_measurement")
-        elif self.conv is not None:
-            self._attr_translation_key = self.conv_config.get("name")
-            self._attr_unique_id = f"{self._unique_id_prefix}_{self._attr_translation_key}_{conv_name}"
-            self._attr_device_class = self.conv_config.get("device_class")
-            self._attr_entity_category = self.conv_config.get("category")
-            self._attr_native_unit_of_measurement = self.conv_config.get("unit_of_measurement")
-        else:
-            self._attr_translation_key = register_config.get("name")
-            self._attr_unique_id = f"{self._unique_id_prefix}_{self._attr_translation_key}_{register_addr:#06x}"
-            self._attr_device_class = register_config.get("device_class")
-            self._attr_entity_category = register_config.get("category")
-            self._attr_native_unit_of_measurement = register_config.get("unit_of_measurement")
+        self._attr_translation_key = desc.name
+        self._attr_unique_id = f"{self._unique_id_prefix}_{desc.unique_suffix}"
+        self._attr_device_class = SensorDeviceClass(desc.device_class) if desc.device_class else None
+        self._attr_entity_category = desc.category
+        self._attr_native_unit_of_measurement = desc.unit_of_measurement
+        self._attr_icon = desc.icon or register.icon
 
         # Initial state
         self._attr_native_value = None
@@ -100,24 +126,20 @@ class ModbusSensor(ModbusSensorMixin, ModbusUniqIdMixin, CoordinatorEntity, Sens
     @property
     def native_value(self):
         """Return the state of the sensor."""
-        if not self.coordinator.data:
+        decoded = self._get_decoded()
+        if decoded is None:
             return
 
-        raw_data = self.coordinator.data.get(self.register_addr)
-        if raw_data is None:
-            return
+        if self.bitmask is not None:
+            raw_value = decoded.bits.get(self.bitmask.mask)
+        elif self.converter is not None:
+            raw_value = decoded.converted.get(self.converter.key)
+        else:
+            raw_value = decoded.value
 
-        raw_value = self._get_raw_value(raw_data)
         if raw_value is None:
             return
 
-        if self.bitmask is not None:
-            raw_value &= self.bitmask
-            if "rshift" in self.bitmask_config:
-                raw_value >>= self.bitmask_config["rshift"]
-        elif self.conv is not None:
-            raw_value = self.conv(raw_value)
-
         if self.choices and raw_value in self.choices:
             return self.choices[raw_value]
 
@@ -128,15 +150,32 @@ class ModbusSensor(ModbusSensorMixin, ModbusUniqIdMixin, CoordinatorEntity, Sens
         """Return additional state attributes."""
         return {
             "register_address": hex(self.register_addr),
-            "data_type": self.register_config.get("data_type"),
-            "register_count": self.register_config.get("count", 1)
+            "data_type": self.register.data_type,
+            "register_count": self.register.count
         }
 
-    @property
-    def icon(self):
-        icon = (
-            self.bitmask_config.get("icon") or
-            self.conv_config.get("icon") or
-            self.register_config.get("icon")
+
+class ModbusBusSensor(ModbusUniqIdMixin, SensorEntity):
+    """ Performance metric of the Modbus bus, polled by HA """
+
+    def __init__(self, master_coordinator, name, config):
+        self.coordinator = master_coordinator
+        self.metric = name
+
+        self._attr_has_entity_name = True
+        self._attr_translation_key = name
+        self._attr_unique_id = f"{self._unique_id_prefix}_{name}"
+        self._attr_native_unit_of_measurement = config.get("unit_of_measurement")
+        self._attr_state_class = config.get("state_class")
+        self._attr_entity_category = EntityCategory.DIAGNOSTIC
+        self._attr_icon = config.get("icon")
+
+        # Device info
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, self.coordinator.config_entry.entry_id)}
         )
-        return icon
+
+    @property
+    def native_value(self):
+        """Return the current metric value."""
+        return self.coordinator.bus_sensor_values.get(self.metric)
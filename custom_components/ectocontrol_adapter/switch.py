@@ -1,12 +1,13 @@
 import logging
 
-from homeassistant.components.switch import SwitchEntity
+from homeassistant.components.switch import SwitchDeviceClass, SwitchEntity
+from homeassistant.const import EntityCategory, Platform
 from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.restore_state import RestoreEntity
 
 from .const import DOMAIN
 from .mixins import ModbusUniqIdMixin
-from .registers import SWITCH_INPUT
+from .register_index import write_registers_for
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -15,13 +16,13 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
     """ Set up switch entities  """
     data = hass.data[DOMAIN][config_entry.entry_id]
     master_coordinator = data["master_coordinator"]
-    write_registers = data["write_registers"]
 
-    entities = []
+    entities = [
+        ModbusSwitch(hass, master_coordinator, register)
+        for register in write_registers_for(Platform.SWITCH)
+    ]
 
-    for register, config in write_registers.items():
-        if config.get("input_type") == SWITCH_INPUT:
-            entities.append(ModbusSwitch(hass, master_coordinator, register, config))
+    entities.append(ModbusTraceSwitch(hass, master_coordinator))
 
     async_add_entities(entities)
 
@@ -29,18 +30,19 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
 class ModbusSwitch(ModbusUniqIdMixin, SwitchEntity, RestoreEntity):
     """ Modbus Switch entity """
 
-    def __init__(self, hass, master_coordinator, register_addr, register_config):
+    def __init__(self, hass, master_coordinator, register):
         self.hass = hass
         self.coordinator = master_coordinator
-        self.register_addr = register_addr
-        self.register_config = register_config
+        self.register_addr = register.address
+        self.register_config = register.config
 
         self._attr_has_entity_name = True
-        self._attr_translation_key = self.register_config.get("name")
-        self._attr_unique_id = f"{self._unique_id_prefix}_{self._attr_translation_key}_{register_addr:#06x}"
+        self._attr_translation_key = register.name
+        self._attr_unique_id = f"{self._unique_id_prefix}_{register.unique_suffix}"
         self._attr_is_on = None  # Initial state is unknown
-        self._attr_device_class = register_config.get("device_class")
-        self._attr_entity_category = register_config.get("category")
+        self._attr_device_class = SwitchDeviceClass(register.device_class) if register.device_class else None
+        self._attr_entity_category = register.category
+        self._attr_icon = register.icon
 
         # Device info
         self._attr_device_info = DeviceInfo(
@@ -62,7 +64,7 @@ class ModbusSwitch(ModbusUniqIdMixin, SwitchEntity, RestoreEntity):
     async def async_turn_on(self, **kwargs):
         wrval = self.register_config["on_value"]
         success = await self.coordinator.write_registers(
-            address=self.register_addr, values=[wrval])
+            address=self.register_addr, values=[wrval], coalesce=True)
 
         if success:
             self._attr_is_on = True
@@ -74,7 +76,7 @@ class ModbusSwitch(ModbusUniqIdMixin, SwitchEntity, RestoreEntity):
     async def async_turn_off(self, **kwargs):
         wrval = self.register_config["off_value"]
         success = await self.coordinator.write_registers(
-            address=self.register_addr, values=[wrval])
+            address=self.register_addr, values=[wrval], coalesce=True)
 
         if success:
             self._attr_is_on = False
@@ -91,6 +93,45 @@ class ModbusSwitch(ModbusUniqIdMixin, SwitchEntity, RestoreEntity):
     def should_poll(self) -> bool:
         return False
 
+
+class ModbusTraceSwitch(ModbusUniqIdMixin, SwitchEntity, RestoreEntity):
+    """ Turns the Modbus transaction trace (see diagnostics) on and off """
+
+    def __init__(self, hass, master_coordinator):
+        self.hass = hass
+        self.coordinator = master_coordinator
+
+        self._attr_has_entity_name = True
+        self._attr_translation_key = "bus_trace"
+        self._attr_unique_id = f"{self._unique_id_prefix}_bus_trace"
+        self._attr_entity_category = EntityCategory.DIAGNOSTIC
+        self._attr_icon = "mdi:format-list-bulleted-type"
+
+        # Device info
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, self.coordinator.config_entry.entry_id)}
+        )
+
+    async def async_added_to_hass(self):
+        await super().async_added_to_hass()
+
+        # The trace belongs to the shared bus, other adapters on it may switch it too
+        self.async_on_remove(self.coordinator.add_trace_listener(self.async_write_ha_state))
+
+        last_state = await self.async_get_last_state()
+        if last_state is not None and last_state.state == "on":
+            self.coordinator.set_trace(True)
+
+    async def async_turn_on(self, **kwargs):
+        self.coordinator.set_trace(True)
+
+    async def async_turn_off(self, **kwargs):
+        self.coordinator.set_trace(False)
+
+    @property
+    def is_on(self) -> bool:
+        return self.coordinator.trace_enabled
+
     @property
-    def icon(self):
-        return self.register_config.get("icon")
+    def should_poll(self) -> bool:
+        return False
@@ -0,0 +1,93 @@
+""" Response timeouts from measured round trips and serial line timing """
+from typing import Any, Dict
+
+from .const import (
+    DEFAULT_PARITY,
+    DEFAULT_SERIAL_BAUDRATE,
+    DEFAULT_SERIAL_BYTESIZE,
+    DEFAULT_STOPBITS,
+    OPT_BAUDRATE,
+    OPT_BYTESIZE,
+    OPT_PARITY,
+    OPT_STOPBITS,
+    RTT_ALPHA,
+    RTT_BETA,
+    RTT_GRANULARITY,
+    RTT_TIMEOUT_MIN
+)
+
+# Timeout doubles after every lost response, up to this factor
+_MAX_BACKOFF = 64
+
+
+class RttEstimator:
+    """
+    Smoothed round-trip time and its variation, as TCP computes its RTO.
+
+    The timeout is SRTT + 4 * RTTVAR clamped to [RTT_TIMEOUT_MIN,
+    max_timeout], doubled after every timeout until the next sample.
+    Until the first sample the configured maximum is used.
+    """
+
+    def __init__(self, max_timeout: float):
+        self.max_timeout = max_timeout
+        self.srtt = None
+        self.rttvar = None
+        self._backoff = 1
+
+    def add(self, rtt: float):
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - RTT_BETA) * self.rttvar + RTT_BETA * abs(self.srtt - rtt)
+            self.srtt = (1 - RTT_ALPHA) * self.srtt + RTT_ALPHA * rtt
+        self._backoff = 1
+
+    def on_timeout(self):
+        self._backoff = min(_MAX_BACKOFF, self._backoff * 2)
+
+    @property
+    def timeout(self) -> float:
+        if self.srtt is None:
+            return self.max_timeout
+        timeout = (self.srtt + max(RTT_GRANULARITY, 4 * self.rttvar)) * self._backoff
+        return min(self.max_timeout, max(RTT_TIMEOUT_MIN, timeout))
+
+    @property
+    def diagnostics(self) -> Dict[str, Any]:
+        return {
+            "srtt": self.srtt,
+            "rttvar": self.rttvar,
+            "backoff": self._backoff,
+            "timeout": self.timeout
+        }
+
+
+class RtuTiming:
+    """
+    Character time, 3.5 character silent interval and frame times of a serial line.
+
+    RTU over TCP gateways do not expose their serial side, the adapter line
+    defaults are assumed there.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        baudrate = int(config.get(OPT_BAUDRATE, DEFAULT_SERIAL_BAUDRATE))
+        bytesize = int(config.get(OPT_BYTESIZE, DEFAULT_SERIAL_BYTESIZE))
+        parity = config.get(OPT_PARITY, DEFAULT_PARITY)
+        stopbits = int(config.get(OPT_STOPBITS, DEFAULT_STOPBITS))
+        # Start bit, data bits, optional parity bit, stop bits
+        bits = 1 + bytesize + (0 if parity == "N" else 1) + stopbits
+        self.char_time = bits / baudrate
+
+        # Above 19200 bps the specification fixes the interval at 1.75 ms
+        self.silent_interval = 0.00175 if baudrate > 19200 else 3.5 * self.char_time
+
+    def frame_time(self, size: int) -> float:
+        """ Time to transmit a frame of `size` bytes """
+        return size * self.char_time
+
+    @property
+    def diagnostics(self) -> Dict[str, Any]:
+        return {"char_time": self.char_time, "silent_interval": self.silent_interval}
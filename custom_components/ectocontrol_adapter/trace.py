@@ -0,0 +1,73 @@
+""" Ring buffer of recent Modbus transactions """
+import time
+from collections import deque
+from typing import Any, Dict, List
+
+from .const import TRACE_SIZE
+
+
+def _describe_result(result, error) -> Dict[str, Any]:
+    if error is not None:
+        return {"exception": f"{type(error).__name__}: {error}"}
+    if result is None:
+        return {"result": None}
+    if result.isError():
+        return {"result": str(result)}
+    registers = getattr(result, "registers", None)
+    return {"result": list(registers) if registers is not None else "ok"}
+
+
+class TransactionTrace:
+    """
+    Last `size` Modbus transactions of a transport.
+
+    Entries are kept as raw tuples with monotonic timestamps, they are
+    formatted only when the trace is downloaded.
+    """
+
+    def __init__(self, size: int = TRACE_SIZE):
+        self._entries = deque(maxlen=size)
+
+    def record(self, operation, started: float, ended: float, result=None, error=None):
+        data = operation.data
+        self._entries.append((
+            operation.id,
+            operation.slave,
+            operation.op,
+            data.get("address"),
+            data.get("count", len(data.get("values", ()))),
+            list(data["values"]) if "values" in data else None,
+            operation.enqueued_at,
+            started,
+            ended,
+            _describe_result(result, error)
+        ))
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def as_list(self) -> List[Dict[str, Any]]:
+        # Monotonic timestamps to wall clock
+        offset = time.time() - time.monotonic()
+        return [
+            {
+                "id": operation_id,
+                "slave": slave,
+                "op": op,
+                "address": f"{address:#06x}" if address is not None else None,
+                "count": count,
+                "values": values,
+                "enqueued": enqueued + offset,
+                "started": started + offset,
+                "ended": ended + offset,
+                "queue_wait_ms": round((started - enqueued) * 1000, 1),
+                "duration_ms": round((ended - started) * 1000, 1),
+                **outcome
+            }
+            for (
+                operation_id, slave, op, address, count, values, enqueued, started, ended, outcome
+            ) in self._entries
+        ]
@@ -0,0 +1,499 @@
+""" Modbus transports shared by all adapters on one bus """
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .const import (
+    DEFAULT_INFLIGHT_WINDOW,
+    DOMAIN,
+    INFLIGHT_WINDOW_MAX,
+    MODBUS_TYPE_SERIAL,
+    MODBUS_TYPE_TCP,
+    MODBUS_TYPE_UDP,
+    OP_PRIORITY_FAST_POLL,
+    OP_PRIORITY_NAMES,
+    OP_PRIORITY_WRITE,
+    OPT_BAUDRATE,
+    OPT_BYTESIZE,
+    OPT_DEVICE,
+    OPT_HOST,
+    OPT_INFLIGHT_WINDOW,
+    OPT_MODBUS_TYPE,
+    OPT_PARITY,
+    OPT_PORT,
+    OPT_RESPONSE_TIMEOUT,
+    OPT_STOPBITS,
+    QUEUE_TIMEOUT
+)
+from .connection import ModbusConnection
+from .metrics import BusMetrics
+from .operations import Operation, OperationDroppedError, OperationQueue
+from .registers import (
+    REG_R_ADAPTER_STATUS,
+    REG_STATUS_OFFSET,
+    REG_STATUS_OK,
+    REG_VERIFY_DELAY_MAX,
+    REG_VERIFY_DELAY_MIN,
+    REG_VERIFY_MAX_ATTEMPTS
+)
+from .trace import TransactionTrace
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_TRANSPORTS = f"{DOMAIN}_transports"
+
+# Operations completed by a follow-up status register check
+WRITE_OPERATIONS = ("write_registers", "write_registers_block")
+
+# Options which must match for config entries sharing one transport
+_SHARED_OPTIONS = (
+    OPT_RESPONSE_TIMEOUT, OPT_BAUDRATE, OPT_BYTESIZE, OPT_PARITY, OPT_STOPBITS, OPT_INFLIGHT_WINDOW)
+
+
+class ResponseMismatchError(Exception):
+    """ Response does not answer the request, e.g. a late response to an earlier one """
+
+
+def response_mismatch(slave: int, op: str, data: Dict[str, Any], result) -> Optional[str]:
+    """ Why `result` cannot be the response to the request, None if it can """
+    if result.dev_id != slave:
+        return f"device {result.dev_id} instead of {slave}"
+    function_code = 16 if op in WRITE_OPERATIONS else 3
+    if result.function_code & 0x7F != function_code:
+        return f"function code {result.function_code & 0x7F} instead of {function_code}"
+    if result.isError():
+        return None
+    if op in WRITE_OPERATIONS:
+        if result.address != data["address"] or result.count != len(data["values"]):
+            return (
+                f"write of {result.count} at {result.address:#06x} "
+                f"instead of {len(data['values'])} at {data['address']:#06x}")
+    elif len(result.registers) != data["count"]:
+        return f"{len(result.registers)} registers instead of {data['count']}"
+    return None
+
+
+def transport_key(config: Dict[str, Any]) -> Tuple:
+    """ Serial device or host:port/framer identifying one physical bus """
+    if config[OPT_MODBUS_TYPE] == MODBUS_TYPE_SERIAL:
+        return (MODBUS_TYPE_SERIAL, config[OPT_DEVICE])
+    return (config[OPT_MODBUS_TYPE], config[OPT_HOST], int(config[OPT_PORT]))
+
+
+def inflight_window(config: Dict[str, Any]) -> int:
+    """
+    Max requests in flight on the transport.
+
+    Only Modbus/TCP and UDP frames carry a transaction id, serial lines
+    and RTU over TCP are strictly one request at a time.
+    """
+    if config[OPT_MODBUS_TYPE] not in (MODBUS_TYPE_TCP, MODBUS_TYPE_UDP):
+        return 1
+    window = int(config.get(OPT_INFLIGHT_WINDOW, DEFAULT_INFLIGHT_WINDOW))
+    return max(1, min(INFLIGHT_WINDOW_MAX, window))
+
+
+async def async_acquire_transport(hass, config: Dict[str, Any]) -> "ModbusTransport":
+    """ Return the running transport for the bus of `config`, create it if needed """
+    transports = hass.data.setdefault(DATA_TRANSPORTS, {})
+    key = transport_key(config)
+
+    transport = transports.get(key)
+    if transport is None:
+        transport = transports[key] = ModbusTransport(key, config)
+        await transport.async_start()
+    else:
+        mismatch = [opt for opt in _SHARED_OPTIONS if config.get(opt) != transport.config.get(opt)]
+        if mismatch:
+            _LOGGER.warning(
+                f"Modbus transport {key} is shared, options {mismatch} "
+                f"of the first config entry are used")
+
+    transport.users += 1
+    return transport
+
+
+async def async_release_transport(hass, transport: "ModbusTransport"):
+    """ Release transport, stop it when the last user is gone """
+    transport.users -= 1
+    if transport.users > 0:
+        return
+
+    hass.data.get(DATA_TRANSPORTS, {}).pop(transport.key, None)
+    await transport.async_stop()
+
+
+class ModbusTransport:
+    """
+    One bus scheduler shared by several slaves.
+
+    Operations are executed by one worker per connection. TCP and UDP
+    transports may open up to `inflight_window` connections, pymodbus
+    matches the responses of each connection by transaction id.
+    """
+
+    def __init__(self, key: Tuple, config: Dict[str, Any]):
+        self.key = key
+        self.config = config
+        self.users = 0
+        self.connections = [ModbusConnection(config) for _ in range(inflight_window(config))]
+        self.connection = self.connections[0]
+        self.metrics = BusMetrics(config[OPT_MODBUS_TYPE])
+        self._last_slave = None
+        self._queue = OperationQueue()
+        self._processing_tasks = []
+        self._is_running = False
+        self._current_operations = {}  # worker -> operation name
+
+        # Writes are never reordered by the window
+        self._write_lock = asyncio.Lock()
+        self.trace = None  # TransactionTrace while enabled
+        self._trace_listeners = set()  # called when the trace is turned on or off
+
+        # Writes waiting for the next status check: verify operation -> timer handle
+        self._verifying = {}
+
+        # Reachability of each slave, called with True on every response: slave -> callback
+        self._outcome_listeners = {}
+
+        # Queue wait per priority class: [count, total, max] (seconds)
+        self._queue_wait = {priority: [0, 0.0, 0.0] for priority in OP_PRIORITY_NAMES}
+
+    async def async_start(self):
+        self._is_running = True
+        self._processing_tasks = [
+            asyncio.create_task(self._process_queue(worker)) for worker in range(len(self.connections))]
+        _LOGGER.info(f"Modbus transport {self.key}: STARTED, {len(self.connections)} request(s) in flight")
+
+    async def async_stop(self):
+        self._is_running = False
+        for task in self._processing_tasks:
+            task.cancel()
+        await asyncio.gather(*self._processing_tasks, return_exceptions=True)
+        self._processing_tasks = []
+
+        # Abort writes waiting for verification
+        for verify, handle in self._verifying.items():
+            handle.cancel()
+            verify.data["write"].future.cancel()
+        self._verifying.clear()
+
+        # Close Modbus connections
+        for connection in self.connections:
+            connection.close()
+
+        _LOGGER.info(f"Modbus transport {self.key}: STOPPED")
+
+    def submit(self, operation: Operation):
+        """ Adds a operation to the bus queue """
+        if not self._is_running:
+            raise RuntimeError("Modbus transport is not running")
+        try:
+            shed = self._queue.put_nowait(operation)
+        except OperationDroppedError:
+            self.metrics.record_dropped(operation.priority, "shed")
+            raise
+        for victim in shed:
+            self._drop(victim, "shed", OperationDroppedError(f"Operation {victim.name} shed, bus is overloaded"))
+        self.metrics.record_queue_depth(self._queue.qsize())
+
+    def _drop(self, operation: Operation, reason: str, error: OperationDroppedError):
+        """ Fail an operation which did not reach the bus """
+        self.metrics.record_dropped(operation.priority, reason)
+        _LOGGER.debug(f"Modbus transport {self.key}: {error}")
+        if not operation.future.done():
+            operation.future.set_exception(error)
+
+    def promote(self, operation: Operation, priority: int) -> bool:
+        return self._queue.promote(operation, priority)
+
+    def is_queued(self, operation: Operation) -> bool:
+        return self._queue.is_queued(operation)
+
+    def set_outcome_listener(self, slave: int, listener: Callable[[bool], None]):
+        """ Report whether operations of the slave got a response """
+        self._outcome_listeners[slave] = listener
+
+    def remove_outcome_listener(self, slave: int):
+        self._outcome_listeners.pop(slave, None)
+
+    def fail_queued(self, slave: int, error: Exception) -> int:
+        """ Fail queued operations and pending write checks of the slave at once """
+        failed = self._queue.drain(slave)
+        for verify in [verify for verify in self._verifying if verify.slave == slave]:
+            self._verifying.pop(verify).cancel()
+            failed.append(verify)
+
+        for operation in failed:
+            future = operation.data["write"].future if operation.op == "verify_write_status" else operation.future
+            if not future.done():
+                future.set_exception(error)
+        return len(failed)
+
+    def _notify_outcome(self, slave: int, success: bool):
+        listener = self._outcome_listeners.get(slave)
+        if listener is not None:
+            listener(success)
+
+    async def _process_queue(self, worker: int = 0):
+        """ The main loop for processing Modbus commands on one connection """
+        connection = self.connections[worker]
+        while self._is_running:
+            try:
+                # Extra workers pause while their connection backs off, the first one fails fast
+                if worker and connection.retry_in() > 0:
+                    await asyncio.sleep(min(connection.retry_in(), QUEUE_TIMEOUT))
+                    continue
+
+                operation = await asyncio.wait_for(self._queue.get(), timeout=QUEUE_TIMEOUT)
+                self._record_queue_wait(operation)
+
+                # A newer request for the same data is due by now
+                if operation.expired(time.monotonic()):
+                    self._drop(operation, "expired", OperationDroppedError(
+                        f"Operation {operation.name} expired after {time.monotonic() - operation.enqueued_at:.1f}s "
+                        f"in '{OP_PRIORITY_NAMES[operation.priority]}' queue"))
+                    continue
+
+                self._current_operations[worker] = operation.name
+                self._last_slave = operation.slave
+                try:
+                    if operation.op in WRITE_OPERATIONS:
+                        async with self._write_lock:
+                            result = await self._execute_operation(operation, connection)
+                    else:
+                        result = await self._execute_operation(operation, connection)
+                except Exception as e:
+                    self._trace(operation, time.monotonic(), error=e)
+                    _LOGGER.error(f"Operation {operation.name} failed: {e}")
+                    if operation.op == "verify_write_status":
+                        self._check_write_status(operation, None)
+                    elif not operation.future.done():
+                        operation.future.set_exception(e)
+                else:
+                    self._complete_operation(operation, result)
+                finally:
+                    self._current_operations.pop(worker, None)
+
+            except asyncio.TimeoutError:
+                if connection.keepalive_due() and self._last_slave is not None:
+                    await self._keepalive(connection)
+                continue
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                _LOGGER.error(f"Unexpected error in queue processing: {e}")
+
+    async def _keepalive(self, connection: ModbusConnection):
+        """ Probe idle gateway so it does not drop the socket """
+        _LOGGER.debug(f"Modbus transport {self.key}: keepalive probe")
+        operation = Operation(
+            self._last_slave, "read_holding_registers",
+            {"address": REG_R_ADAPTER_STATUS, "count": 1}, OP_PRIORITY_FAST_POLL)
+        try:
+            await self._execute_operation(operation, connection)
+        except Exception as e:
+            _LOGGER.debug(f"Modbus transport {self.key}: keepalive failed: {e}")
+
+    async def _execute_operation(self, operation: Operation, connection: ModbusConnection):
+        """ Backend for execute same operation """
+        slave, op, data = operation.slave, operation.op, operation.data
+        try:
+            client = await connection.async_get_client()
+        except Exception:
+            self._notify_outcome(slave, False)
+            raise
+        await connection.async_prepare_request(op, data)
+
+        started = time.monotonic()
+        try:
+            if op in ("read_holding_registers", "verify_write_status"):
+                result = await client.read_holding_registers(
+                    address=data["address"],
+                    count=data["count"],
+                    device_id=slave
+                )
+            elif op in WRITE_OPERATIONS:
+                result = await client.write_registers(
+                    address=data["address"],
+                    values=data["values"],
+                    device_id=slave
+                )
+            else:
+                raise ValueError(f"Unknown operation type: {op}")
+
+            mismatch = response_mismatch(slave, op, data, result) if result is not None else None
+            if mismatch:
+                raise ResponseMismatchError(f"Response to '{op}' at {data['address']:#06x} rejected: {mismatch}")
+
+            duration = time.monotonic() - started
+            connection.record_success(op, data, duration, getattr(result, "retries", 0))
+            self.metrics.record_operation(op, data, duration, result is not None and not result.isError())
+            self._trace(operation, started, result)
+            self._notify_outcome(slave, result is not None)
+            return result
+
+        except Exception as e:
+            # Loaded with the client by create_modbus_client
+            from pymodbus.exceptions import ModbusIOException
+
+            timeout = isinstance(e, (ModbusIOException, asyncio.TimeoutError))
+            # A mismatched response means the line is out of step, as after a timeout
+            connection.record_failure(timeout or isinstance(e, ResponseMismatchError), op, data)
+            self.metrics.record_operation(op, data, time.monotonic() - started, False, timeout=timeout)
+            self._trace(operation, started, error=e)
+            self._notify_outcome(slave, False)
+            _LOGGER.error(f"Error executing '{op}' operation: {e}")
+
+    def _complete_operation(self, operation: Operation, result):
+        if operation.op in WRITE_OPERATIONS:
+            self._start_verify(operation, result)
+        elif operation.op == "verify_write_status":
+            self._check_write_status(operation, result)
+        elif not operation.future.done():
+            operation.future.set_result(result)
+
+    def _start_verify(self, operation: Operation, result):
+        """
+        Schedule status register check of the write.
+
+        The bus is not held while the adapter applies the value, the check
+        is queued as a separate operation and the caller's future is
+        completed by it.
+        """
+        block = operation.op == "write_registers_block"
+        if result is None or result.isError():
+            self._finish_write(operation, None if block else False)
+            return
+
+        data = operation.data
+        verify = Operation(
+            operation.slave,
+            "verify_write_status",
+            {
+                "write": operation,
+                "result": result,
+                "address": data.get("status_register") or data["address"] + REG_STATUS_OFFSET,
+                "count": len(data["values"]) if block else 1,
+                "attempt": 0,
+                "written_at": time.monotonic()
+            },
+            OP_PRIORITY_WRITE)
+        self._schedule_verify(verify)
+
+    def _schedule_verify(self, verify: Operation):
+        """ Queue the status check after an exponential backoff """
+        delay = min(REG_VERIFY_DELAY_MAX, REG_VERIFY_DELAY_MIN * 2 ** verify.data["attempt"])
+        self._verifying[verify] = asyncio.get_running_loop().call_later(delay, self._queue_verify, verify)
+
+    def _queue_verify(self, verify: Operation):
+        self._verifying.pop(verify, None)
+        if not self._is_running:
+            return
+        verify.enqueued_at = time.monotonic()
+        self._queue.requeue(verify)
+
+    def _check_write_status(self, verify: Operation, result):
+        """ Complete the write when status registers report OK, retry otherwise """
+        data = verify.data
+        write = data["write"]
+        count = data["count"]
+        success_status = write.data.get("success_status", REG_STATUS_OK)
+
+        success = [False] * count
+        if result is not None:
+            if result.isError():
+                _LOGGER.error(f"Modbus read status register={data['address']:#06x} error")
+            elif len(result.registers) == count:
+                success = [status == success_status for status in result.registers]
+
+        data["attempt"] += 1
+        if all(success) or data["attempt"] >= REG_VERIFY_MAX_ATTEMPTS:
+            self.metrics.verification.add(time.monotonic() - data["written_at"])
+            if write.op == "write_registers_block":
+                self._finish_write(write, success)
+            else:
+                self._finish_write(write, all(success) and data["result"])
+            return
+
+        self._schedule_verify(verify)
+
+    @staticmethod
+    def _finish_write(write: Operation, result):
+        if not write.future.done():
+            write.future.set_result(result)
+
+    def set_trace(self, enabled: bool):
+        if enabled and self.trace is None:
+            self.trace = TransactionTrace()
+        elif not enabled:
+            self.trace = None
+        _LOGGER.info(f"Modbus transport {self.key}: transaction trace {'enabled' if enabled else 'disabled'}")
+        for listener in list(self._trace_listeners):
+            listener()
+
+    def add_trace_listener(self, listener: Callable[[], None]) -> Callable[[], None]:
+        """ Call `listener` when the trace is turned on or off, return its remover """
+        self._trace_listeners.add(listener)
+        return lambda: self._trace_listeners.discard(listener)
+
+    def _trace(self, operation: Operation, started: float, result=None, error=None):
+        if self.trace is not None:
+            self.trace.record(operation, started, time.monotonic(), result, error)
+
+    def _record_queue_wait(self, operation: Operation):
+        """ Update queue wait statistics of the operation priority class """
+        wait = time.monotonic() - operation.enqueued_at
+        stats = self._queue_wait[operation.priority]
+        stats[0] += 1
+        stats[1] += wait
+        stats[2] = max(stats[2], wait)
+        self.metrics.queue_wait.add(wait)
+        if wait > QUEUE_TIMEOUT:
+            _LOGGER.debug(
+                f"Operation {operation.name} waited {wait:.3f}s in "
+                f"'{OP_PRIORITY_NAMES[operation.priority]}' queue")
+
+    @property
+    def diagnostics(self) -> Dict[str, Any]:
+        return {
+            "modbus_type": self.key[0],
+            "users": self.users,
+            "queue_size": self.queue_size,
+            "queue_wait": self.queue_wait_stats,
+            "inflight_window": len(self.connections),
+            "metrics": self.metrics.diagnostics,
+            "connection": self.connection.diagnostics,
+            "extra_connections": [connection.diagnostics for connection in self.connections[1:]]
+        }
+
+    @property
+    def sensor_values(self) -> Dict[str, Any]:
+        """ Values of the bus diagnostic sensors """
+        return {
+            **self.metrics.sensor_values,
+            "bus_reconnects": sum(connection.reconnects for connection in self.connections)
+        }
+
+    @property
+    def current_operation(self) -> str:
+        """ Return IDs of the operations in flight """
+        return ", ".join(self._current_operations.values()) or None
+
+    @property
+    def queue_size(self) -> int:
+        """ Current queue size """
+        return self._queue.qsize()
+
+    @property
+    def queue_wait_stats(self) -> Dict[str, Dict[str, float]]:
+        """ Queue wait time (seconds) per priority class """
+        return {
+            OP_PRIORITY_NAMES[priority]: {
+                "count": count,
+                "avg": total / count if count else 0.0,
+                "max": max_wait
+            }
+            for priority, (count, total, max_wait) in self._queue_wait.items()
+        }
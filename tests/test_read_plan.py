@@ -0,0 +1,67 @@
+""" Block read plan execution """
+import asyncio
+
+import pytest
+from pymodbus.pdu import ExceptionResponse
+from pymodbus.pdu.register_message import ReadHoldingRegistersResponse
+
+from custom_components.ectocontrol_adapter.coordinator import async_read_plan
+from custom_components.ectocontrol_adapter.operations import OperationDroppedError
+from custom_components.ectocontrol_adapter.planner import build_read_plan
+
+
+class FakeMaster:
+    """ Answers block reads with `error` and single reads with register addresses """
+
+    def __init__(self, error=None, dropped=()):
+        self.error = error
+        self.dropped = dropped
+        self.calls = []
+
+    async def read_holding_registers(self, address, count, priority, deadline=None):
+        self.calls.append((address, count))
+        if address in self.dropped:
+            raise OperationDroppedError(f"Read at {address:#06x} expired")
+        if count > 1 and self.error is not None:
+            return ExceptionResponse(3, self.error)
+        return ReadHoldingRegistersResponse(registers=list(range(address, address + count)))
+
+
+def _plan():
+    return build_read_plan([(0x10, 1), (0x12, 1), (0x14, 1)])
+
+
+@pytest.mark.parametrize("error", [0x06, 0x0A, 0x0B])
+def test_transient_error_keeps_block(error):
+    plan = _plan()
+    master = FakeMaster(error)
+
+    data = asyncio.run(async_read_plan(master, plan, 0))
+
+    assert data == {0x10: None, 0x12: None, 0x14: None}
+    assert master.calls == [(0x10, 5)]
+    assert [(block.address, block.count) for block in plan] == [(0x10, 5)]
+
+
+def test_illegal_address_splits_block():
+    plan = _plan()
+    master = FakeMaster(0x02)
+
+    data = asyncio.run(async_read_plan(master, plan, 0))
+
+    assert data == {0x10: [0x10], 0x12: [0x12], 0x14: [0x14]}
+    assert [(block.address, block.count) for block in plan] == [(0x10, 1), (0x12, 1), (0x14, 1)]
+
+    master.calls.clear()
+    asyncio.run(async_read_plan(master, plan, 0))
+    assert master.calls == [(0x10, 1), (0x12, 1), (0x14, 1)]
+
+
+def test_dropped_block_is_left_out():
+    plan = build_read_plan([(0x10, 1), (0x12, 1), (0x40, 1)], max_gap=2)
+    master = FakeMaster(dropped=(0x10,))
+
+    data = asyncio.run(async_read_plan(master, plan, 0))
+
+    assert data == {0x40: [0x40]}
+    assert master.calls == [(0x10, 3), (0x40, 1)]
@@ -0,0 +1 @@
+""" Development tools for the ectoControl Adapter integration """
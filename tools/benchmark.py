@@ -0,0 +1,259 @@
+"""
+End-to-end polling and write benchmark.
+
+Drives the real ModbusMasterCoordinator, the scan groups of
+async_setup_entry and their PollScheduler against the local adapter
+simulator (see tools/simulator.py) over every transport and prints the
+results as JSON, so runs of different releases can be compared:
+
+    python -m tools.benchmark --output bench.json
+    python -m tools.benchmark --types tcp serial --baudrate 9600 --latency 0.01
+
+Figures per transport:
+
+- poll_cycle: duration of one scheduler tick per set of scan groups due
+  together, named by their scan intervals (seconds)
+- refresh_cpu: process CPU time per scheduler tick of each set (seconds)
+- period: ticks, read blocks, adapter requests and bus time of one full
+  scheduler period, i.e. what the integration sends to the bus
+- write_verify: write plus status verification latency (seconds)
+- concurrent: queue wait per priority class and throughput (ops/s) while
+  all groups are polled and values written at the same time
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import types
+from typing import Any, Dict, List
+
+import pymodbus
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.ectocontrol_adapter.const import (
+    MODBUS_TYPE_RTU_OVER_TCP,
+    MODBUS_TYPE_SERIAL,
+    MODBUS_TYPE_TCP,
+    MODBUS_TYPE_UDP,
+    OPT_ADAPTIVE_POLLING,
+    OPT_INFLIGHT_WINDOW
+)
+from custom_components.ectocontrol_adapter.coordinator import ModbusDataUpdateCoordinator, register_groups
+from custom_components.ectocontrol_adapter.master import ModbusMasterCoordinator
+from custom_components.ectocontrol_adapter.registers import REG_W_COOLANT_TEMP
+from custom_components.ectocontrol_adapter.scheduler import PollScheduler
+
+from .simulator import AdapterSimulator, SimulatedAdapter
+
+_LOGGER = logging.getLogger(__name__)
+
+ALL_TYPES = [MODBUS_TYPE_TCP, MODBUS_TYPE_RTU_OVER_TCP, MODBUS_TYPE_UDP, MODBUS_TYPE_SERIAL]
+
+_MANIFEST = os.path.join(
+    os.path.dirname(__file__), os.pardir, "custom_components", "ectocontrol_adapter", "manifest.json")
+
+
+def summarize(samples: List[float]) -> Dict[str, Any]:
+    """ Distribution of the samples """
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean": statistics.fmean(ordered),
+        "min": ordered[0],
+        "p50": ordered[len(ordered) // 2],
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "max": ordered[-1]
+    }
+
+
+def _scheduler_ticks(coordinators) -> List[tuple]:
+    """ Groups due on each tick of one scheduler period, in tick order """
+    intervals = {int(coordinator.poll_interval) for coordinator in coordinators}
+    period = math.lcm(*intervals)
+    ticks = sorted({tick for interval in intervals for tick in range(interval, period + 1, interval)})
+    return [
+        tuple(coordinator for coordinator in coordinators if tick % int(coordinator.poll_interval) == 0)
+        for tick in ticks
+    ]
+
+
+def _tick_name(due) -> str:
+    return "+".join(str(interval) for interval in sorted({coordinator.poll_interval for coordinator in due}))
+
+
+async def _timed_poll(scheduler, due) -> tuple:
+    """ Wall clock and CPU time of one scheduler tick """
+    started, cpu_started = time.perf_counter(), time.process_time()
+    await scheduler._async_poll(due)
+    return time.perf_counter() - started, time.process_time() - cpu_started
+
+
+async def _write_verify(master, value: int) -> float:
+    started = time.perf_counter()
+    await master.write_registers(REG_W_COOLANT_TEMP, [value], force=True)
+    return time.perf_counter() - started
+
+
+async def benchmark_transport(hass, modbus_type: str, args) -> Dict[str, Any]:
+    adapter = SimulatedAdapter(latency=args.latency, jitter=args.jitter, apply_delay=args.apply_delay)
+    simulator = AdapterSimulator(modbus_type, port=args.port, baudrate=args.baudrate, adapter=adapter)
+    config = await simulator.async_start()
+    config[OPT_INFLIGHT_WINDOW] = args.inflight_window
+    config[OPT_ADAPTIVE_POLLING] = args.adaptive_polling
+    config_entry = types.SimpleNamespace(
+        entry_id=f"benchmark_{modbus_type}", title=modbus_type, data=config, options={})
+
+    master = ModbusMasterCoordinator(hass, config_entry)
+    await master.async_start()
+    try:
+        # Scan groups and scheduler as async_setup_entry creates them, the
+        # scheduler ticks are driven here instead of by its timer
+        coordinators = [
+            ModbusDataUpdateCoordinator(hass, config_entry, master, registers, scan_interval=group[0])
+            for group, registers in register_groups(config).items()
+        ]
+        scheduler = PollScheduler(config_entry, master, coordinators)
+
+        # Warm up: connect and fill the coordinators with the startup poll
+        await scheduler._async_poll(tuple(coordinators))
+
+        # Sequential scheduler ticks of every set of groups due together
+        ticks = _scheduler_ticks(coordinators)
+        poll_cycle, refresh_cpu = {}, {}
+        for due in dict.fromkeys(ticks):
+            durations, cpu = [], []
+            for _ in range(args.iterations):
+                duration, cpu_time = await _timed_poll(scheduler, due)
+                durations.append(duration)
+                cpu.append(cpu_time)
+            poll_cycle[_tick_name(due)] = summarize(durations)
+            refresh_cpu[_tick_name(due)] = summarize(cpu)
+
+        # One full scheduler period
+        requests = adapter.requests
+        started = time.perf_counter()
+        for due in ticks:
+            await scheduler._async_poll(due)
+        period = {
+            "seconds": math.lcm(*(int(coordinator.poll_interval) for coordinator in coordinators)),
+            "ticks": len(ticks),
+            "read_blocks": sum(len(scheduler._plans[frozenset(due)][0]) for due in ticks),
+            "adapter_requests": adapter.requests - requests,
+            "bus_time": time.perf_counter() - started
+        }
+
+        # Sequential writes with verification
+        write_verify = summarize([
+            await _write_verify(master, 400 + iteration % 2 * 10) for iteration in range(args.writes)])
+
+        # All groups and writes at once
+        metrics = master._transport.metrics
+        operations = metrics.operations
+        started = time.perf_counter()
+        for iteration in range(args.iterations):
+            await asyncio.gather(
+                scheduler._async_poll(tuple(coordinators)),
+                _write_verify(master, 400 + iteration % 2 * 10))
+        elapsed = time.perf_counter() - started
+        concurrent = {
+            "rounds": args.iterations,
+            "duration": elapsed,
+            "throughput": (metrics.operations - operations) / elapsed,
+            "queue_wait": master.queue_wait_stats,
+            "queue_high_water": metrics.queue_high_water
+        }
+
+        return {
+            "poll_cycle": poll_cycle,
+            "refresh_cpu": refresh_cpu,
+            "period": period,
+            "write_verify": write_verify,
+            "concurrent": concurrent,
+            "bus": metrics.diagnostics,
+            "adapter_requests": adapter.requests
+        }
+    finally:
+        await master.async_stop()
+        await simulator.async_stop()
+
+
+def _skip_reason(modbus_type: str):
+    if modbus_type == MODBUS_TYPE_SERIAL:
+        try:
+            import serial  # noqa: F401
+        except ImportError:
+            return "pyserial is not installed"
+    return None
+
+
+async def async_run(args) -> Dict[str, Any]:
+    with open(_MANIFEST) as manifest:
+        version = json.load(manifest)["version"]
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        results = {}
+        for modbus_type in args.types:
+            reason = _skip_reason(modbus_type)
+            if reason:
+                results[modbus_type] = {"skipped": reason}
+                continue
+            _LOGGER.info(f"Benchmark '{modbus_type}'")
+            results[modbus_type] = await benchmark_transport(hass, modbus_type, args)
+
+    return {
+        "version": version,
+        "python": platform.python_version(),
+        "pymodbus": pymodbus.__version__,
+        "settings": {
+            "iterations": args.iterations,
+            "writes": args.writes,
+            "latency": args.latency,
+            "jitter": args.jitter,
+            "apply_delay": args.apply_delay,
+            "baudrate": args.baudrate,
+            "inflight_window": args.inflight_window,
+            "adaptive_polling": args.adaptive_polling
+        },
+        "results": results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ectoControl adapter polling and write benchmark")
+    parser.add_argument("--types", nargs="+", default=ALL_TYPES, choices=ALL_TYPES)
+    parser.add_argument("--iterations", type=int, default=20, help="polls per set of scan groups due together")
+    parser.add_argument("--writes", type=int, default=10, help="sequential write-plus-verify runs")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated adapter response time, s")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra response time, s")
+    parser.add_argument("--apply-delay", type=float, default=0.1, help="simulated time to apply a value, s")
+    parser.add_argument("--baudrate", type=int, default=9600, help="serial line speed")
+    parser.add_argument("--inflight-window", type=int, default=1, help="TCP/UDP requests in flight")
+    parser.add_argument("--adaptive-polling", action="store_true", help="adaptive registers in own scan groups")
+    parser.add_argument("--port", type=int, default=5020, help="TCP/UDP port of the simulator")
+    parser.add_argument("--output", help="write JSON results to this file instead of stdout")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    report = asyncio.run(async_run(args))
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
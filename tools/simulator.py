@@ -0,0 +1,498 @@
+"""
+ectoControl adapter simulator.
+
+Serves the register map of the integration (REGISTERS_R/REGISTERS_W) with
+the adapter semantics the integration relies on:
+
+- write registers report the result in the status register
+  (address + REG_STATUS_OFFSET): REG_STATUS_NOT_INIT while the value is
+  applied, then REG_STATUS_OK, REG_STATUS_UNSUPPORTED or
+  REG_STATUS_ERROR_OP when the boiler is not connected
+- commands written to REG_W_COMMAND are answered in REG_R_COMMAND_REPLY
+- uptime is counted from the (simulated) adapter boot
+- the boiler connectivity bit of the adapter status can be toggled
+
+Transports: tcp, rtuovertcp, udp and serial (two linked pseudo terminals,
+bytes are delayed by the configured line speed).
+
+Run from the repository root:
+
+    python -m tools.simulator --type tcp --port 5020 --latency 0.02
+
+or drive it from Python, see `AdapterSimulator`.
+
+Supports pymodbus 3.11.2 to 3.16: up to 3.12 the adapter is served as a
+device context, from 3.13 as a SimDevice whose registers are filled by an
+action on every request.
+"""
+import argparse
+import asyncio
+import functools
+import logging
+import os
+import pty
+import random
+import struct
+import time
+import tty
+from typing import Any, Callable, Dict, List, Optional
+
+from pymodbus import FramerType
+from pymodbus.constants import ExcCodes
+from pymodbus.datastore import ModbusServerContext
+
+try:
+    # pymodbus 3.11 - 3.12
+    from pymodbus.datastore import ModbusBaseDeviceContext
+except ImportError:
+    # pymodbus 3.13+
+    from pymodbus.simulator import DataType, SimData, SimDevice
+    ModbusBaseDeviceContext = None
+from pymodbus.server import ModbusSerialServer, ModbusTcpServer, ModbusUdpServer
+
+from custom_components.ectocontrol_adapter.const import (
+    MODBUS_TYPE_RTU_OVER_TCP,
+    MODBUS_TYPE_SERIAL,
+    MODBUS_TYPE_TCP,
+    MODBUS_TYPE_UDP,
+    OPT_BAUDRATE,
+    OPT_BYTESIZE,
+    OPT_DEVICE,
+    OPT_HOST,
+    OPT_MODBUS_TYPE,
+    OPT_PARITY,
+    OPT_PORT,
+    OPT_RESPONSE_TIMEOUT,
+    OPT_SLAVE,
+    OPT_STOPBITS
+)
+from custom_components.ectocontrol_adapter.registers import (
+    ADAPTER_STATUS_CONNECTED,
+    BURNER_STATUS_ON,
+    BYTE_TYPES,
+    REGISTERS_R,
+    REGISTERS_W,
+    REG_R_ADAPTER_STATUS,
+    REG_R_ADAPTER_UPTIME,
+    REG_R_ADAPTER_VERSION,
+    REG_R_BURNER_STATUS,
+    REG_R_COMMAND_REPLY,
+    REG_STATUS_ERROR_OP,
+    REG_STATUS_NOT_INIT,
+    REG_STATUS_OFFSET,
+    REG_STATUS_OK,
+    REG_STATUS_UNSUPPORTED,
+    REG_TYPE_MAPPING,
+    REG_W_COMMAND,
+    REG_W_COOLANT_TEMP,
+    REG_W_MODE
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Adapter commands
+COMMAND_REBOOT = 2
+COMMAND_RESET_BOILER_ERRORS = 3
+
+# Highest address served, reads above it fail with "illegal address"
+MAX_ADDRESS = 0x00FF
+
+# Read registers mirroring write registers (limits set by the integration)
+_MIRRORED = {0x0033: 0x0014, 0x0034: 0x0015, 0x0035: 0x0016, 0x0036: 0x0017}
+
+# Initial boiler values by read register name (engineering units)
+DEFAULT_BOILER = {
+    "coolant_min_temp": 40,
+    "coolant_max_temp": 80,
+    "dhw_min_temp": 40,
+    "dhw_max_temp": 55,
+    "coolant_temp": 45.0,
+    "dhw_temp": 42.0,
+    "current_pressure": 1.5,
+    "current_flow_rate": 0.0,
+    "burner_modulation": 0,
+    "burner_status_raw": 0,
+    "main_error_code": 0,
+    "add_error_code": 0,
+    "outer_temp": -5,
+    "vendor_code": 1,
+    "model_code": 1,
+    "opentherm_errors": 0
+}
+
+
+def encode_value(register_config: Dict[str, Any], value) -> List[int]:
+    """ Engineering value to raw registers, inverse of RegisterDecoder """
+    data_type = register_config["data_type"]
+    count = register_config.get("count", 1)
+    scale = register_config.get("scale")
+    if scale:
+        value = value / scale
+    if data_type not in ("float32", "float64"):
+        value = int(round(value))
+
+    packed = struct.pack(f">{REG_TYPE_MAPPING[data_type]}", value)
+    if data_type in BYTE_TYPES:
+        packed = b"\x00" + packed
+    return list(struct.unpack(f">{count}H", packed))
+
+
+def default_boiler_step(adapter: "SimulatedAdapter", elapsed: float):
+    """
+    Very simple boiler: the burner keeps the coolant at the setpoint of
+    REG_W_COOLANT_TEMP while heating is enabled by REG_W_MODE.
+    """
+    boiler = adapter.boiler
+    setpoint = adapter.holding.get(REG_W_COOLANT_TEMP, 0) * REGISTERS_W[REG_W_COOLANT_TEMP]["scale"]
+    heating = adapter.holding.get(REG_W_MODE, 0) & 0b001
+
+    temp = boiler["coolant_temp"]
+    if heating and adapter.connected and temp < setpoint - 2:
+        burner_on = True
+    elif not heating or not adapter.connected or temp > setpoint + 2:
+        burner_on = False
+    else:
+        burner_on = bool(boiler["burner_status_raw"] & BURNER_STATUS_ON)
+
+    boiler["burner_status_raw"] = BURNER_STATUS_ON | 0b010 if burner_on else 0
+    boiler["burner_modulation"] = 60 if burner_on else 0
+    boiler["current_flow_rate"] = 0.0
+    boiler["coolant_temp"] = temp + (0.5 if burner_on else -0.1) * elapsed
+
+
+class SimulatedAdapter:
+    """
+    Register state and behaviour of one adapter.
+
+    Everything here can be changed while the simulator runs: `latency`,
+    `jitter`, `apply_delay`, `unsupported`, `boiler` values and `boiler_step`.
+    """
+
+    def __init__(
+            self,
+            latency: float = 0.0,
+            jitter: float = 0.0,
+            apply_delay: float = 0.1,
+            boiler_step: Optional[Callable] = default_boiler_step):
+        self.latency = latency
+        self.jitter = jitter
+        self.apply_delay = apply_delay
+        self.boiler_step = boiler_step
+        self.unsupported = set()  # write registers answered with REG_STATUS_UNSUPPORTED
+
+        self.connected = True
+        self.adapter_bus = 0b000  # OpenTherm
+        self.sw_version = 12
+        self.hw_version = 3
+        self.reboot_code = 0
+        self.boiler = dict(DEFAULT_BOILER)
+
+        # Written values and status registers
+        self.holding = {}
+        self.status = {
+            address + REG_STATUS_OFFSET: REG_STATUS_NOT_INIT for address in REGISTERS_W if address != REG_W_COMMAND}
+        self.status[REG_R_COMMAND_REPLY] = REG_STATUS_NOT_INIT
+
+        self.requests = 0
+        self._booted_at = time.monotonic()
+        self._last_step = self._booted_at
+
+    @property
+    def uptime(self) -> int:
+        return int(time.monotonic() - self._booted_at)
+
+    def set_connectivity(self, connected: bool):
+        """ Toggle the adapter to boiler connection """
+        self.connected = connected
+
+    def reboot(self, reboot_code: int = 0x01):
+        """ Restart the adapter: written values and statuses are lost """
+        self._booted_at = self._last_step = time.monotonic()
+        self.reboot_code = reboot_code
+        self.holding.clear()
+        for address in self.status:
+            self.status[address] = REG_STATUS_NOT_INIT
+
+    async def delay(self):
+        """ Response time of the adapter """
+        self.requests += 1
+        latency = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0)
+        if latency > 0:
+            await asyncio.sleep(latency)
+
+    def _step(self):
+        now = time.monotonic()
+        if self.boiler_step is not None:
+            self.boiler_step(self, now - self._last_step)
+        self._last_step = now
+
+    def _read_map(self) -> Dict[int, int]:
+        self._step()
+        registers = {}
+        for address, config in REGISTERS_R.items():
+            if address == REG_R_ADAPTER_STATUS:
+                value = self.reboot_code | self.adapter_bus << 8 | (ADAPTER_STATUS_CONNECTED if self.connected else 0)
+                registers[address] = value
+            elif address == REG_R_ADAPTER_VERSION:
+                registers[address] = self.sw_version | self.hw_version << 8
+            elif address == REG_R_ADAPTER_UPTIME:
+                high, low = encode_value(config, self.uptime)
+                registers[address], registers[address + 1] = high, low
+            elif config["name"] in self.boiler:
+                value = self.boiler[config["name"]]
+                if not self.connected and address != REG_R_BURNER_STATUS:
+                    value = 0
+                for offset, word in enumerate(encode_value(config, value)):
+                    registers[address + offset] = word
+        registers.update(self.holding)
+        for address, value in self.status.items():
+            registers[address] = value & 0xFFFF
+        return registers
+
+    def read(self, address: int, count: int):
+        if address + count - 1 > MAX_ADDRESS:
+            return ExcCodes.ILLEGAL_ADDRESS
+        registers = self._read_map()
+        return [registers.get(address + offset, 0) for offset in range(count)]
+
+    def write(self, address: int, values: List[int]):
+        addresses = range(address, address + len(values))
+        if any(addr not in REGISTERS_W for addr in addresses):
+            return ExcCodes.ILLEGAL_ADDRESS
+
+        loop = asyncio.get_running_loop()
+        for addr, value in zip(addresses, values):
+            self.holding[addr] = value
+            status_register = REG_R_COMMAND_REPLY if addr == REG_W_COMMAND else addr + REG_STATUS_OFFSET
+            self.status[status_register] = REG_STATUS_NOT_INIT
+            loop.call_later(self.apply_delay, self._apply, addr, value, status_register)
+        return None
+
+    def _apply(self, address: int, value: int, status_register: int):
+        """ The boiler accepted (or refused) the written value """
+        if address in self.unsupported:
+            self.status[status_register] = REG_STATUS_UNSUPPORTED
+        elif address == REG_W_COMMAND:
+            self.status[status_register] = self._command(value)
+        elif not self.connected:
+            self.status[status_register] = REG_STATUS_ERROR_OP
+        else:
+            if address in _MIRRORED:
+                self.boiler[REGISTERS_R[_MIRRORED[address]]["name"]] = value
+            self.status[status_register] = REG_STATUS_OK
+
+    def _command(self, command: int) -> int:
+        if command == COMMAND_REBOOT:
+            self.reboot(reboot_code=0x02)
+            return REG_STATUS_OK
+        if command == COMMAND_RESET_BOILER_ERRORS:
+            self.boiler["main_error_code"] = self.boiler["add_error_code"] = 0
+            return REG_STATUS_OK
+        return REG_STATUS_UNSUPPORTED
+
+
+if ModbusBaseDeviceContext is not None:
+    class AdapterDeviceContext(ModbusBaseDeviceContext):
+        """ pymodbus datastore backed by `SimulatedAdapter` """
+
+        def __init__(self, adapter: SimulatedAdapter):
+            self.adapter = adapter
+
+        def reset(self):
+            self.adapter.reboot()
+
+        async def async_getValues(self, func_code, address, count=1):
+            await self.adapter.delay()
+            if func_code not in (3, 4, 16):
+                return ExcCodes.ILLEGAL_FUNCTION
+            return self.adapter.read(address, count)
+
+        async def async_setValues(self, func_code, address, values):
+            await self.adapter.delay()
+            if func_code not in (6, 16):
+                return ExcCodes.ILLEGAL_FUNCTION
+            return self.adapter.write(address, list(values))
+
+
+async def _adapter_action(adapter: SimulatedAdapter, func_code, start_address, address, count, registers, values):
+    """ SimDevice action: answer from `SimulatedAdapter` instead of the stored registers """
+    await adapter.delay()
+    if values is not None:
+        if func_code not in (6, 16):
+            return ExcCodes.ILLEGAL_FUNCTION
+        return adapter.write(address, list(values))
+
+    if func_code not in (3, 4):
+        return ExcCodes.ILLEGAL_FUNCTION
+    result = adapter.read(address, count)
+    if isinstance(result, ExcCodes):
+        return result
+    offset = address - start_address
+    registers[offset:offset + count] = result
+    return None
+
+
+def adapter_context(adapter: SimulatedAdapter):
+    """ Server context serving `adapter` with the datastore API of the installed pymodbus """
+    if ModbusBaseDeviceContext is not None:
+        return ModbusServerContext(devices=AdapterDeviceContext(adapter), single=True)
+    return SimDevice(
+        id=0,
+        simdata=[SimData(0, count=MAX_ADDRESS + 1, datatype=DataType.REGISTERS)],
+        action=functools.partial(_adapter_action, adapter))
+
+
+class _PtyLink:
+    """ Two linked pseudo terminals (like `socat pty pty`) running at `baudrate` """
+
+    def __init__(self, baudrate: int, bits_per_char: int = 10):
+        self._char_time = bits_per_char / baudrate
+        self._pairs = []
+        for _ in range(2):
+            master, slave = pty.openpty()
+            tty.setraw(slave)
+            self._pairs.append((master, slave))
+        self.ports = [os.ttyname(slave) for _, slave in self._pairs]
+        self._free_at = {}
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        (a, _), (b, _) = self._pairs
+        loop.add_reader(a, self._relay, a, b)
+        loop.add_reader(b, self._relay, b, a)
+
+    def _relay(self, src: int, dst: int):
+        try:
+            data = os.read(src, 4096)
+        except OSError:
+            return
+        loop = asyncio.get_running_loop()
+        # Bytes leave the line one after another at the line speed
+        done = max(loop.time(), self._free_at.get(dst, 0.0)) + len(data) * self._char_time
+        self._free_at[dst] = done
+        loop.call_at(done, self._write, dst, data)
+
+    @staticmethod
+    def _write(fd: int, data: bytes):
+        try:
+            os.write(fd, data)
+        except OSError:
+            pass
+
+    def close(self):
+        loop = asyncio.get_running_loop()
+        for master, slave in self._pairs:
+            loop.remove_reader(master)
+            os.close(master)
+            os.close(slave)
+
+
+class AdapterSimulator:
+    """
+    Simulated adapter served over one Modbus transport.
+
+        simulator = AdapterSimulator(MODBUS_TYPE_TCP, port=5020)
+        config = await simulator.async_start()  # config entry data for the client
+        simulator.adapter.latency = 0.05
+        simulator.adapter.set_connectivity(False)
+        await simulator.async_stop()
+    """
+
+    def __init__(
+            self,
+            modbus_type: str = MODBUS_TYPE_TCP,
+            host: str = "127.0.0.1",
+            port: int = 5020,
+            baudrate: int = 9600,
+            adapter: Optional[SimulatedAdapter] = None):
+        self.modbus_type = modbus_type
+        self.host = host
+        self.port = port
+        self.baudrate = baudrate
+        self.adapter = adapter or SimulatedAdapter()
+        self._server = None
+        self._link = None
+
+    async def async_start(self) -> Dict[str, Any]:
+        """ Start serving, return config entry data to connect to the simulator """
+        context = adapter_context(self.adapter)
+        config = {OPT_MODBUS_TYPE: self.modbus_type, OPT_SLAVE: 1, OPT_RESPONSE_TIMEOUT: 3}
+
+        if self.modbus_type == MODBUS_TYPE_SERIAL:
+            self._link = _PtyLink(self.baudrate)
+            self._link.start()
+            server_port, client_port = self._link.ports
+            self._server = ModbusSerialServer(context, port=server_port, baudrate=self.baudrate)
+            config.update({
+                OPT_DEVICE: client_port,
+                OPT_BAUDRATE: self.baudrate,
+                OPT_BYTESIZE: 8,
+                OPT_PARITY: "N",
+                OPT_STOPBITS: 1
+            })
+        else:
+            address = (self.host, self.port)
+            if self.modbus_type == MODBUS_TYPE_TCP:
+                self._server = ModbusTcpServer(context, address=address)
+            elif self.modbus_type == MODBUS_TYPE_RTU_OVER_TCP:
+                self._server = ModbusTcpServer(context, framer=FramerType.RTU, address=address)
+            elif self.modbus_type == MODBUS_TYPE_UDP:
+                self._server = ModbusUdpServer(context, address=address)
+            else:
+                raise ValueError(f"Unknown Modbus type: {self.modbus_type}")
+            config.update({OPT_HOST: self.host, OPT_PORT: self.port})
+
+        await self._server.serve_forever(background=True)
+        _LOGGER.info(f"Simulated adapter ({self.modbus_type}) started: {config}")
+        return config
+
+    async def async_stop(self):
+        if self._server is not None:
+            await self._server.shutdown()
+            self._server = None
+        if self._link is not None:
+            self._link.close()
+            self._link = None
+
+
+async def _async_main(args):
+    adapter = SimulatedAdapter(latency=args.latency, jitter=args.jitter, apply_delay=args.apply_delay)
+    simulator = AdapterSimulator(args.type, args.host, args.port, args.baudrate, adapter)
+    config = await simulator.async_start()
+    print(f"Connect with: {config}")
+
+    # Scripted connectivity flaps
+    try:
+        while True:
+            if args.flap_period:
+                await asyncio.sleep(args.flap_period)
+                adapter.set_connectivity(not adapter.connected)
+                _LOGGER.info(f"Boiler connectivity: {adapter.connected}")
+            else:
+                await asyncio.sleep(3600)
+    finally:
+        await simulator.async_stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ectoControl adapter simulator")
+    parser.add_argument("--type", default=MODBUS_TYPE_TCP, choices=[
+        MODBUS_TYPE_TCP, MODBUS_TYPE_RTU_OVER_TCP, MODBUS_TYPE_UDP, MODBUS_TYPE_SERIAL])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5020)
+    parser.add_argument("--baudrate", type=int, default=9600, help="serial line speed")
+    parser.add_argument("--latency", type=float, default=0.0, help="adapter response time, s")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra response time, s")
+    parser.add_argument("--apply-delay", type=float, default=0.1, help="time to apply a written value, s")
+    parser.add_argument("--flap-period", type=float, default=0.0, help="toggle boiler connectivity every N s")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(_async_main(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()